@@ -6,10 +6,14 @@ from .models import Comment, News
 class CommentInline(admin.StackedInline):
     model = Comment
     extra = 0
+    fields = ('author', 'text', 'is_flagged')
 
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
+    list_display = ('title', 'date', 'comment_count')
+    list_filter = ('comment__is_flagged',)
+    readonly_fields = ('comment_count',)
     inlines = [
         CommentInline,
     ]
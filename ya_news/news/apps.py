@@ -1,7 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
+
+# Сессии в кеше: выход из одного процесса должен быть виден остальным.
+CACHED_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
 
 
 class NewsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'news'
     verbose_name = 'Новости'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .cache import require_shared_cache
+
+        if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES:
+            require_shared_cache(
+                settings.SESSION_CACHE_ALIAS, 'SESSION_ENGINE'
+            )
@@ -0,0 +1,63 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .views import NewsDetailView, NewsList
+
+_executor = None
+
+
+def get_executor():
+    """Отдельный пул потоков для базы и шаблонов, общий на процесс."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.NEWS_DB_THREADS,
+            thread_name_prefix='news-db',
+        )
+    return _executor
+
+
+def _respond(view, request, *args, **kwargs):
+    """
+    Выполняет представление и рендерит ответ в потоке пула.
+
+    Соединения потоков пула живут дольше запроса, поэтому устаревшие
+    закрываем до и после, как это делает обработчик запросов.
+    """
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def pooled(view):
+    """
+    Асинхронная обёртка над синхронным представлением.
+
+    Запросы к базе и рендеринг идут в ограниченном пуле потоков, а не
+    в единственном потоке sync_to_async, и цикл событий не блокируется.
+    Контекстные переменные запроса, например выбор базы для чтения,
+    передаются в поток пула.
+    """
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(),
+            context.run,
+            partial(_respond, view, request, *args, **kwargs),
+        )
+    return async_view
+
+
+news_list = pooled(NewsList.as_view())
+news_detail = pooled(NewsDetailView.as_view())
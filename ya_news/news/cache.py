@@ -0,0 +1,227 @@
+import math
+import random
+import time
+from collections import Counter
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+VERSION_KEY = 'news:{pk}:version'
+FRAGMENT_KEY = 'news:fragment:{name}:{pk}:{version}:{vary}'
+
+fragment_stats = Counter()
+
+
+def require_shared_cache(alias, feature):
+    """
+    Проверяет при запуске, что кеш alias общий для всех процессов.
+
+    Кеши, которые сбрасываются версиями в кеше, а не в строках базы,
+    с локальным кешем каждого процесса отдавали бы устаревшие данные:
+    сброс в одном процессе не виден остальным.
+    """
+    backend = caches[alias]
+    if isinstance(backend, (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            f'{feature} требует общего для процессов кеша, а кеш '
+            f'{alias!r} — {type(backend).__name__}.'
+        )
+
+
+def _new_version():
+    # Если ключ версии вытеснен из кеша, начинаем с метки времени, а не
+    # с единицы, чтобы не попасть на старые фрагменты с той же версией.
+    return time.time_ns()
+
+
+def get_versions(pks):
+    """Возвращает версии нескольких новостей за один запрос к кешу."""
+    keys = {VERSION_KEY.format(pk=pk): pk for pk in pks}
+    versions = {
+        keys[key]: version
+        for key, version in cache.get_many(keys).items()
+    }
+    for key, pk in keys.items():
+        if pk not in versions:
+            cache.add(key, _new_version(), None)
+            versions[pk] = cache.get(key)
+    return versions
+
+
+def get_version(pk):
+    return get_versions((pk,))[pk]
+
+
+def bump_version(pk):
+    """Делает устаревшими все закешированные страницы новости."""
+    key = VERSION_KEY.format(pk=pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _new_version(), None)
+
+
+def fragment_key(name, news, *vary_on):
+    """
+    Ключ фрагмента по версии из строки новости.
+
+    News.version растёт при любом изменении новости и её комментариев
+    и приходит вместе со строкой, поэтому ключ одинаков во всех процессах
+    и не требует общего кеша для версий.
+    """
+    vary = md5(
+        ':'.join(str(value) for value in vary_on).encode()
+    ).hexdigest()
+    return FRAGMENT_KEY.format(
+        name=name, pk=news.pk, version=news.version, vary=vary
+    )
+
+
+def get_fragment(key, render):
+    """Отдаёт фрагмент из кеша или строит его и запоминает."""
+    rendered = []
+
+    def counted_render():
+        rendered.append(True)
+        return render()
+
+    content = single_flight(
+        key, counted_render, settings.FRAGMENT_CACHE_TIMEOUT
+    )
+    fragment_stats['misses' if rendered else 'hits'] += 1
+    return content
+
+
+PAGES_VERSION_KEY = 'news:pages:version'
+
+
+def get_pages_version():
+    """Версия страниц со списками новостей для кеша целых страниц."""
+    cache.add(PAGES_VERSION_KEY, _new_version(), None)
+    return cache.get(PAGES_VERSION_KEY) or _new_version()
+
+
+def bump_pages_version():
+    cache.set(PAGES_VERSION_KEY, _new_version(), None)
+
+
+LOCK_KEY = '{key}:lock'
+# Блокировка пересчёта снимается сама, если считавший процесс упал.
+LOCK_TIMEOUT = 30
+# Насколько рано XFetch начинает пересчёт: чем больше, тем раньше.
+XFETCH_BETA = 1.0
+WAIT_STEP = 0.02
+
+# hits — значение из кеша; computed — пересчёты, из них early — досрочные
+# по XFetch; stale и waited — схлопнутые пересчёты: запрос получил старое
+# значение или дождался чужого пересчёта вместо своего.
+flight_stats = Counter()
+
+
+def needs_early_refresh(entry, beta=XFETCH_BETA):
+    """
+    Вероятностное досрочное истечение (XFetch).
+
+    Запись (значение, время пересчёта, срок) считается истёкшей чуть
+    раньше срока, и тем вероятнее, чем дольше пересчёт и ближе срок.
+    Так один из запросов обновляет значение до того, как оно пропадёт
+    у всех сразу.
+    """
+    _, delta, expires = entry
+    return time.time() - delta * beta * math.log(
+        1 - random.random()
+    ) >= expires
+
+
+class SingleFlight:
+    """
+    Один пересчёт значения на ключ, остальные не ждут базу.
+
+    get() отдаёт значение, если его не нужно пересчитывать, или
+    старое значение, пока пересчитывает другой. Если вернулся None,
+    то при leader=True пересчитать должен вызывающий, иначе ему стоит
+    подождать через poll(). В кеше лежат записи (значение, время
+    пересчёта, срок); stale_key — ключ без версии, где хранится
+    последнее значение на время пересчёта. Если get() отдал значение
+    из stale_key, stale=True.
+    """
+
+    def __init__(self, key, timeout, stale_key=None):
+        self.key = key
+        self.timeout = timeout
+        self.stale_key = stale_key
+        self.lock_key = LOCK_KEY.format(key=key)
+        self.leader = False
+        self.stale = False
+
+    def get(self):
+        entries = cache.get_many(
+            [self.key] + ([self.stale_key] if self.stale_key else [])
+        )
+        entry = entries.get(self.key)
+        if entry is not None and not needs_early_refresh(entry):
+            flight_stats['hits'] += 1
+            return entry[0]
+        if cache.add(self.lock_key, True, LOCK_TIMEOUT):
+            self.leader = True
+            if entry is not None:
+                flight_stats['early'] += 1
+            return None
+        stale = entry or entries.get(self.stale_key)
+        if stale is not None:
+            flight_stats['stale'] += 1
+            self.stale = entry is None
+            return stale[0]
+        return None
+
+    def poll(self):
+        """Значение, которое успел сохранить пересчитывающий запрос."""
+        entry = cache.get(self.key)
+        if entry is None:
+            return None
+        flight_stats['waited'] += 1
+        return entry[0]
+
+    def set(self, value, delta):
+        flight_stats['computed'] += 1
+        entry = (value, delta, time.time() + self.timeout)
+        entries = {self.key: entry}
+        if self.stale_key:
+            entries[self.stale_key] = entry
+        cache.set_many(entries, self.timeout)
+
+    def release(self):
+        if self.leader:
+            cache.delete(self.lock_key)
+            self.leader = False
+
+
+def single_flight(key, compute, timeout, stale_key=None):
+    """
+    Значение из кеша; пересчитывает его только один запрос.
+
+    Остальные получают старое значение или ждут пересчёта не дольше
+    settings.SINGLE_FLIGHT_WAIT секунд, а потом считают сами.
+    """
+    flight = SingleFlight(key, timeout, stale_key)
+    value = flight.get()
+    if value is not None:
+        return value
+    if not flight.leader:
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(WAIT_STEP)
+            value = flight.poll()
+            if value is not None:
+                return value
+    try:
+        started = time.monotonic()
+        value = compute()
+        flight.set(value, time.monotonic() - started)
+    finally:
+        flight.release()
+    return value
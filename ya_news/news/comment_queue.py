@@ -0,0 +1,149 @@
+import sqlite3
+import threading
+from collections import Counter, namedtuple
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Comment, News
+from .signals import invalidate_news
+
+DIRECT = 'direct'
+QUEUE = 'queue'
+
+SCHEMA_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS pending_comment (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        news_id INTEGER NOT NULL,
+        author_id INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        created TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS pending_comment_news_author_idx
+    ON pending_comment (news_id, author_id)
+    """,
+)
+
+PendingComment = namedtuple(
+    'PendingComment', 'id news_id author_id text created'
+)
+
+_local = threading.local()
+
+
+def is_enabled():
+    return settings.COMMENT_INGESTION == QUEUE
+
+
+def connect():
+    """
+    Соединение с файлом очереди, своё у каждого потока.
+
+    Очередь — отдельная база SQLite рядом с приложением: запись в неё не
+    ждёт блокировки основной базы. synchronous=FULL, чтобы принятый
+    комментарий пережил и падение машины, а не только процесса.
+    """
+    path = str(settings.COMMENT_QUEUE_PATH)
+    if getattr(_local, 'path', None) != path:
+        connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=FULL')
+        for statement in SCHEMA_SQL:
+            connection.execute(statement)
+        _local.connection, _local.path = connection, path
+    return _local.connection
+
+
+def _pending(row):
+    id_, news_id, author_id, text, created = row
+    return PendingComment(
+        id_, news_id, author_id, text, datetime.fromisoformat(created)
+    )
+
+
+def enqueue(news_id, author_id, text):
+    """Ставит проверенный комментарий в очередь и возвращает его."""
+    created = timezone.now()
+    cursor = connect().execute(
+        'INSERT INTO pending_comment (news_id, author_id, text, created) '
+        'VALUES (?, ?, ?, ?)',
+        (news_id, author_id, text, created.isoformat()),
+    )
+    return PendingComment(cursor.lastrowid, news_id, author_id, text, created)
+
+
+def pending_for(news_id, author_id):
+    """Комментарии автора к новости, которые ещё не перенесены в базу."""
+    return [
+        _pending(row) for row in connect().execute(
+            'SELECT id, news_id, author_id, text, created '
+            'FROM pending_comment WHERE news_id = ? AND author_id = ? '
+            'ORDER BY id',
+            (news_id, author_id),
+        )
+    ]
+
+
+def drain(batch_size):
+    """
+    Переносит в базу до batch_size комментариев из очереди.
+
+    Комментарии вставляются одним bulk_create, счётчики и версии новостей
+    обновляются одним UPDATE на новость, всё в одной транзакции вместе
+    с проверкой, что новости и авторы ещё существуют. Из очереди пачка
+    удаляется после коммита, поэтому при падении между ними пачка
+    перенесётся ещё раз (доставка «хотя бы один раз»).
+    Комментарии к удалённым новостям и от удалённых пользователей
+    отбрасываются. Время комментария — время переноса: created
+    заполняется базой через auto_now_add. Возвращает число
+    обработанных записей очереди.
+    """
+    connection = connect()
+    rows = [
+        _pending(row) for row in connection.execute(
+            'SELECT id, news_id, author_id, text, created '
+            'FROM pending_comment ORDER BY id LIMIT ?',
+            (batch_size,),
+        )
+    ]
+    if not rows:
+        return 0
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        # Только основная база: реплика может ещё не знать о новости или
+        # пользователе, и комментарий был бы молча отброшен.
+        news_ids = set(News.objects.using(DEFAULT_DB_ALIAS).filter(
+            pk__in={row.news_id for row in rows}
+        ).values_list('pk', flat=True))
+        author_ids = set(
+            get_user_model().objects.using(DEFAULT_DB_ALIAS).filter(
+                pk__in={row.author_id for row in rows}
+            ).values_list('pk', flat=True)
+        )
+        rows_to_save = [
+            row for row in rows
+            if row.news_id in news_ids and row.author_id in author_ids
+        ]
+        counts = Counter(row.news_id for row in rows_to_save)
+        Comment.objects.bulk_create(
+            Comment(
+                news_id=row.news_id, author_id=row.author_id, text=row.text
+            )
+            for row in rows_to_save
+        )
+        for news_id, count in counts.items():
+            News.objects.filter(pk=news_id).update(
+                comment_count=F('comment_count') + count,
+                version=F('version') + 1,
+            )
+            invalidate_news(news_id)
+    connection.execute(
+        'DELETE FROM pending_comment WHERE id <= ?', (rows[-1].id,)
+    )
+    return len(rows)
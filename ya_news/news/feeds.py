@@ -0,0 +1,127 @@
+import io
+from datetime import datetime, time, timezone
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+from django.views import generic
+from django.views.decorators.http import condition
+
+from .models import News
+
+ENCODING = 'utf-8'
+
+
+class StreamingFeedMixin:
+    """
+    Пишет ленту частями: заголовок, затем записи по одной, затем хвост.
+
+    Заголовок и хвост берутся из документа без записей, который
+    разрезается по закрывающему тегу, перед которым стоят записи.
+    """
+    items_end_tag = None
+
+    def __init__(self, *args, last_modified=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_modified = last_modified
+
+    def latest_post_date(self):
+        return self.last_modified or super().latest_post_date()
+
+    def stream(self, items):
+        head, tail = self.writeString(ENCODING).rsplit(self.items_end_tag, 1)
+        yield head
+        for item in items:
+            self.items = []
+            self.add_item(**item)
+            buffer = io.StringIO()
+            self.write_items(SimplerXMLGenerator(
+                buffer, ENCODING, short_empty_elements=True
+            ))
+            yield buffer.getvalue()
+        self.items = []
+        yield self.items_end_tag + tail
+
+
+class StreamingRssFeed(StreamingFeedMixin, Rss201rev2Feed):
+    items_end_tag = '</channel>'
+
+
+class StreamingAtomFeed(StreamingFeedMixin, Atom1Feed):
+    items_end_tag = '</feed>'
+
+
+def feed_state(request):
+    """
+    Состояние ленты: ETag и дата для lastBuildDate из одного агрегата.
+
+    Сумма версий меняется при любом сохранении новости, число и
+    наибольший id — при добавлении и удалении. Поэтому ETag одинаков во
+    всех процессах и не зависит от кеша. Last-Modified не отдаём: правка
+    старой новости не сдвигает наибольшую дату, и запрос только с
+    If-Modified-Since получил бы устаревшую ленту. Считается один раз на
+    запрос; записи ленты при этом не читаются.
+    """
+    if not hasattr(request, '_feed_state'):
+        state = News.objects.aggregate(
+            latest=Max('date'), count=Count('id'), last_id=Max('id'),
+            versions=Sum('version'),
+        )
+        latest = state['latest']
+        request._feed_state = (
+            '{latest}-{count}-{last_id}-{versions}'.format(**state),
+            latest and datetime.combine(latest, time.min, tzinfo=timezone.utc),
+        )
+    return request._feed_state
+
+
+def feed_etag(request, *args, **kwargs):
+    return feed_state(request)[0]
+
+
+@method_decorator(condition(etag_func=feed_etag), name='get')
+class NewsFeed(generic.View):
+    """Лента последних новостей; на условный GET отвечает 304."""
+    feed_class = StreamingRssFeed
+
+    def get(self, request, *args, **kwargs):
+        feed = self.feed_class(
+            title='YaNews',
+            link=request.build_absolute_uri(reverse('news:home')),
+            description='Последние новости YaNews',
+            language=settings.LANGUAGE_CODE,
+            feed_url=request.build_absolute_uri(),
+            last_modified=feed_state(request)[1],
+        )
+        response = StreamingHttpResponse(
+            feed.stream(self.get_items(request)),
+            content_type=feed.content_type,
+        )
+        return response
+
+    def get_items(self, request):
+        news_feed = News.objects.only('id', 'title', 'text', 'date')[
+            :settings.NEWS_COUNT_IN_FEED
+        ]
+        for news in news_feed.iterator():
+            link = request.build_absolute_uri(
+                reverse('news:detail', args=(news.pk,))
+            )
+            yield {
+                'title': news.title,
+                'link': link,
+                'unique_id': link,
+                'description': Truncator(news.text).words(30),
+                'pubdate': datetime.combine(
+                    news.date, time.min, tzinfo=timezone.utc
+                ),
+            }
+
+
+class NewsAtomFeed(NewsFeed):
+    feed_class = StreamingAtomFeed
@@ -0,0 +1,65 @@
+import random
+import string
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from news.matcher import AhoCorasick
+
+
+def naive_search(words, text):
+    """Прежняя проверка: поиск подстроки для каждого слова словаря."""
+    for word in words:
+        if word in text:
+            return word
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск запрещённых слов перебором и автоматом '
+        'Ахо — Корасик на длинных комментариях и больших словарях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--words', type=int, nargs='+', default=[10, 1000, 10000],
+            help='Размеры словарей.',
+        )
+        parser.add_argument(
+            '--length', type=int, nargs='+', default=[200, 5000],
+            help='Длины комментариев в символах.',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        alphabet = string.ascii_lowercase[:12] + ' '
+        self.stdout.write(
+            f'{"слов":>7} {"символов":>9} {"перебор, мс":>12} '
+            f'{"автомат, мс":>12} {"ускорение":>10}'
+        )
+        for words_count in options['words']:
+            words = [
+                ''.join(rng.choices(alphabet[:-1], k=rng.randint(8, 14)))
+                for _ in range(words_count)
+            ]
+            matcher = AhoCorasick(words)
+            for length in options['length']:
+                text = ''.join(rng.choices(alphabet, k=length))
+                assert (
+                    naive_search(words, text) is None
+                ) == (matcher.search(text) is None)
+                naive = min(timeit.repeat(
+                    lambda: naive_search(words, text),
+                    number=1, repeat=options['repeat'],
+                ))
+                automaton = min(timeit.repeat(
+                    lambda: matcher.search(text),
+                    number=1, repeat=options['repeat'],
+                ))
+                self.stdout.write(
+                    f'{words_count:>7} {length:>9} {naive * 1000:>12.3f} '
+                    f'{automaton * 1000:>12.3f} {naive / automaton:>9.1f}x'
+                )
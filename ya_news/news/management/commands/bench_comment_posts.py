@@ -0,0 +1,94 @@
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from news.comment_queue import DIRECT, QUEUE, drain
+from news.models import News
+
+BENCH_USERNAME = 'bench'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает число принятых комментариев в секунду при записи '
+        'прямо в базу и через очередь. Пишет в базу, поэтому запускать '
+        'на заполненной копии базы (seed_news).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Размер пачки drain_comments в режиме очереди.',
+        )
+
+    def handle(self, *args, **options):
+        news = News.objects.order_by('-comment_count').first()
+        if news is None:
+            raise CommandError('В базе нет новостей: запустите seed_news.')
+        self.user, _ = get_user_model().objects.get_or_create(
+            username=BENCH_USERNAME
+        )
+        self.url = reverse('news:detail', args=(news.pk,))
+        self.stdout.write(
+            f'{"режим":>6} {"постов/с":>9} {"ошибок":>7} '
+            f'{"перенос, с":>11} {"итого/с":>8}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for mode in (DIRECT, QUEUE):
+                with override_settings(
+                    ALLOWED_HOSTS=['testserver'],
+                    COMMENT_INGESTION=mode,
+                    COMMENT_QUEUE_PATH=Path(directory) / 'queue.sqlite3',
+                ):
+                    self.run_mode(mode, options)
+
+    def run_mode(self, mode, options):
+        """
+        Замер одного режима.
+
+        В режиме очереди после приёма очередь переносится в базу, и
+        «итого» учитывает обе части: сколько комментариев в секунду
+        дошло до базы.
+        """
+        posts = options['posts']
+        local = threading.local()
+
+        def get_client(index=None):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+                client.force_login(self.user)
+            return client
+
+        def post(index):
+            response = get_client().post(
+                self.url, {'text': f'Комментарий {mode} {index}'}
+            )
+            return response.status_code == 302
+
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            # Вход в систему по возможности не входит в замер.
+            list(executor.map(get_client, range(options['concurrency'])))
+            started = time.monotonic()
+            results = list(executor.map(post, range(posts)))
+            accepted = time.monotonic() - started
+        drained = 0.0
+        if mode == QUEUE:
+            started = time.monotonic()
+            while drain(options['batch_size']):
+                pass
+            drained = time.monotonic() - started
+        self.stdout.write(
+            f'{mode:>6} {posts / accepted:>9.0f} '
+            f'{results.count(False):>7} {drained:>11.2f} '
+            f'{posts / (accepted + drained):>8.0f}'
+        )
@@ -0,0 +1,204 @@
+import json
+import platform
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from news.models import Comment, News
+
+BENCH_USERNAME = 'bench'
+# Сколько запросов пройти под tracemalloc: он замедляет код в разы,
+# поэтому память меряется отдельным последовательным проходом.
+MEMORY_REQUESTS = 20
+
+
+class Endpoint:
+    """Страница и способ построить i-й запрос к ней."""
+
+    def __init__(self, name, method, make_request, login=False):
+        self.name = name
+        self.method = method
+        self.make_request = make_request
+        self.login = login
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает страницы ya_news параллельными запросами и выводит '
+        'пропускную способность, p50/p99, число запросов к базе и пиковую '
+        'память для каждой страницы. Пишет в базу, поэтому запускать '
+        'на заполненной копии базы (seed_news).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--endpoints', nargs='+',
+            help='Какие страницы мерить; по умолчанию все.',
+        )
+        parser.add_argument(
+            '--output', help='Куда записать результаты в JSON.',
+        )
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        self.user, _ = get_user_model().objects.get_or_create(
+            username=BENCH_USERNAME
+        )
+        endpoints = self.get_endpoints(options['requests'])
+        if options['endpoints']:
+            endpoints = [
+                endpoint for endpoint in endpoints
+                if endpoint.name in options['endpoints']
+            ]
+        results = []
+        self.stdout.write(
+            f'{"страница":>10} {"запросов/с":>11} {"p50, мс":>8} '
+            f'{"p99, мс":>8} {"запросов к БД":>14} {"память, КиБ":>12}'
+        )
+        for endpoint in endpoints:
+            result = self.measure(endpoint, options)
+            results.append(result)
+            self.stdout.write(
+                f'{result["endpoint"]:>10} {result["throughput"]:>11.0f} '
+                f'{result["p50_ms"]:>8.1f} {result["p99_ms"]:>8.1f} '
+                f'{result["queries_mean"]:>14.1f} '
+                f'{result["peak_memory_kib"]:>12.0f}'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(
+                    self.report(results, options), output,
+                    ensure_ascii=False, indent=2,
+                )
+
+    def get_endpoints(self, requests):
+        """
+        Страницы для замера.
+
+        Новость берётся самая обсуждаемая. Для редактирования и удаления
+        заранее создаются комментарии пользователя bench, по одному на
+        запрос, чтобы каждый запрос делал настоящую работу.
+        """
+        news = News.objects.order_by('-comment_count').first()
+        if news is None:
+            raise CommandError('В базе нет новостей: запустите seed_news.')
+        total = requests + MEMORY_REQUESTS
+        Comment.objects.bulk_create(
+            Comment(news=news, author=self.user, text='Для замера')
+            for _ in range(total * 2)
+        )
+        own_comments = list(
+            Comment.objects.filter(author=self.user).order_by(
+                '-pk'
+            ).values_list('pk', flat=True)[:total * 2]
+        )
+        News.objects.filter(pk=news.pk).update(
+            comment_count=Comment.objects.filter(news=news).count()
+        )
+        edited, deleted = own_comments[:total], own_comments[total:]
+        detail_url = reverse('news:detail', args=(news.pk,))
+        return [
+            Endpoint(
+                'home', 'get', lambda index: (reverse('news:home'), None)
+            ),
+            Endpoint('detail', 'get', lambda index: (detail_url, None)),
+            Endpoint(
+                'search', 'get',
+                lambda index: (reverse('news:search'), {'q': 'новости'}),
+            ),
+            Endpoint(
+                'feed', 'get', lambda index: (reverse('news:feed_rss'), None)
+            ),
+            Endpoint(
+                'comment', 'post',
+                lambda index: (detail_url, {'text': f'Комментарий {index}'}),
+                login=True,
+            ),
+            Endpoint(
+                'edit', 'post',
+                lambda index: (
+                    reverse('news:edit', args=(edited[index],)),
+                    {'text': f'Правка {index}'},
+                ),
+                login=True,
+            ),
+            Endpoint(
+                'delete', 'post',
+                lambda index: (
+                    reverse('news:delete', args=(deleted[index],)), None
+                ),
+                login=True,
+            ),
+        ]
+
+    def measure(self, endpoint, options):
+        requests = options['requests']
+        local = threading.local()
+
+        def send(index):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+                if endpoint.login:
+                    client.force_login(self.user)
+            path, data = endpoint.make_request(index)
+            queries = []
+            with connection.execute_wrapper(
+                lambda execute, *args: queries.append(1) or execute(*args)
+            ):
+                started = time.perf_counter()
+                response = getattr(client, endpoint.method)(path, data)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                latency = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{endpoint.name}: {path} вернул {response.status_code}'
+                )
+            return latency, len(queries)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            samples = list(executor.map(send, range(requests)))
+        elapsed = time.monotonic() - started
+
+        tracemalloc.start()
+        for index in range(requests, requests + MEMORY_REQUESTS):
+            send(index)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        latencies = [latency for latency, _ in samples]
+        queries = [count for _, count in samples]
+        percentiles = statistics.quantiles(latencies, n=100)
+        return {
+            'endpoint': endpoint.name,
+            'requests': requests,
+            'throughput': requests / elapsed,
+            'p50_ms': percentiles[49] * 1000,
+            'p99_ms': percentiles[98] * 1000,
+            'queries_mean': statistics.mean(queries),
+            'queries_max': max(queries),
+            'peak_memory_kib': peak / 1024,
+        }
+
+    def report(self, results, options):
+        return {
+            'project': 'ya_news',
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'concurrency': options['concurrency'],
+            'results': results,
+        }
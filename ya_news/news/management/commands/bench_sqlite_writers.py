@@ -0,0 +1,121 @@
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+
+PROFILES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'CONN_MAX_AGE': 0,
+    },
+    'production': {
+        'ENGINE': 'yanews.sqlite',
+        'CONN_MAX_AGE': 600,
+    },
+}
+NEWS_COUNT = 10
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает конкурентную запись комментариев в SQLite с '
+        'настройками по умолчанию и в рабочем профиле.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers', type=int, default=8,
+            help='Сколько потоков пишут одновременно.',
+        )
+        parser.add_argument(
+            '--writes', type=int, default=200,
+            help='Сколько комментариев пишет каждый поток.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"профиль":>11} {"записей/с":>10} {"ошибок":>7} '
+            f'{"время, с":>9}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for profile, settings_dict in PROFILES.items():
+                alias = f'bench_{profile}'
+                connections.settings[alias] = {
+                    **settings_dict,
+                    'NAME': str(Path(directory) / f'{profile}.sqlite3'),
+                }
+                try:
+                    self.prepare(alias)
+                    self.run_profile(profile, alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections.settings[alias]
+
+    def prepare(self, alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE bench_news ('
+                'id INTEGER PRIMARY KEY, comment_count INTEGER NOT NULL)'
+            )
+            cursor.execute(
+                'CREATE TABLE bench_comment ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'news_id INTEGER NOT NULL, text TEXT NOT NULL)'
+            )
+            cursor.executemany(
+                'INSERT INTO bench_news (id, comment_count) VALUES (%s, 0)',
+                [(pk,) for pk in range(1, NEWS_COUNT + 1)],
+            )
+
+    def run_profile(self, profile, alias, options):
+        errors = []
+        started = time.monotonic()
+        threads = [
+            threading.Thread(
+                target=self.write_comments,
+                args=(alias, number, options['writes'], errors),
+            )
+            for number in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        written = options['writers'] * options['writes'] - len(errors)
+        self.stdout.write(
+            f'{profile:>11} {written / elapsed:>10.0f} {len(errors):>7} '
+            f'{elapsed:>9.2f}'
+        )
+
+    def write_comments(self, alias, number, writes, errors):
+        """
+        Пишет комментарии так же, как Comment.save, по запросу на запись.
+
+        После каждой записи соединение закрывается, если профиль не
+        держит его открытым, — как в конце HTTP-запроса.
+        """
+        connection = connections[alias]
+        for index in range(writes):
+            news_id = (number + index) % NEWS_COUNT + 1
+            try:
+                with transaction.atomic(using=alias):
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            'INSERT INTO bench_comment (news_id, text) '
+                            'VALUES (%s, %s)',
+                            (news_id, f'Комментарий {number}-{index}'),
+                        )
+                        cursor.execute(
+                            'UPDATE bench_news '
+                            'SET comment_count = comment_count + 1 '
+                            'WHERE id = %s',
+                            (news_id,),
+                        )
+            except OperationalError as error:
+                errors.append(error)
+            connection.close_if_unusable_or_obsolete()
+        connection.close()
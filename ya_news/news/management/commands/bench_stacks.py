@@ -0,0 +1,101 @@
+import asyncio
+import importlib
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import clear_url_caches, reverse
+
+from news import urls
+from news.models import News
+
+
+def use_stack(stack):
+    """Пересобирает маршруты news под выбранный стек."""
+    with override_settings(SERVER_STACK=stack):
+        importlib.reload(urls)
+    clear_url_caches()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает ленту и страницу новости под WSGI (потоки с Client) '
+        'и под ASGI (сопрограммы с AsyncClient) при высокой конкуренции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Сколько запросов отправить на каждую страницу.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=50,
+            help='Сколько запросов выполняется одновременно.',
+        )
+
+    # Сравниваем отрисовку, поэтому кеш целых страниц выключен.
+    @override_settings(ALLOWED_HOSTS=['testserver'], PAGE_CACHE_ROUTES=())
+    def handle(self, *args, **options):
+        news = News.objects.first()
+        if news is None:
+            raise CommandError('В базе нет новостей: сначала заполните её.')
+        self.stdout.write(
+            f'{"стек":>5} {"страница":>14} {"запросов/с":>11} '
+            f'{"p50, мс":>8} {"p99, мс":>8}'
+        )
+        try:
+            stacks = (('wsgi', self.run_wsgi), ('asgi', self.run_asgi))
+            for stack, run in stacks:
+                use_stack(stack)
+                for path in (
+                    reverse('news:home'),
+                    reverse('news:detail', args=(news.pk,)),
+                ):
+                    started = time.monotonic()
+                    results = run(path, options)
+                    self.report(
+                        stack, path, results, time.monotonic() - started
+                    )
+        finally:
+            use_stack(settings.SERVER_STACK)
+
+    def run_wsgi(self, path, options):
+        def get(_):
+            started = time.perf_counter()
+            response = Client().get(path)
+            return time.perf_counter() - started, response.status_code
+
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            return list(executor.map(get, range(options['requests'])))
+
+    def run_asgi(self, path, options):
+        async def main():
+            semaphore = asyncio.Semaphore(options['concurrency'])
+            client = AsyncClient()
+
+            async def get():
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    return time.perf_counter() - started, response.status_code
+
+            return await asyncio.gather(
+                *(get() for _ in range(options['requests']))
+            )
+
+        return asyncio.run(main())
+
+    def report(self, stack, path, results, elapsed):
+        latencies = [latency for latency, _ in results]
+        failed = sum(status != HTTPStatus.OK for _, status in results)
+        if failed:
+            raise CommandError(f'{stack} {path}: {failed} ответов не 200.')
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'{stack:>5} {path:>14} {len(latencies) / elapsed:>11.0f} '
+            f'{percentiles[49] * 1000:>8.1f} {percentiles[98] * 1000:>8.1f}'
+        )
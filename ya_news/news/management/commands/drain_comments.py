@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from news.comment_queue import drain
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит комментарии из очереди (COMMENT_INGESTION = queue) '
+        'в базу пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько комментариев вставлять одной транзакцией.',
+        )
+        parser.add_argument(
+            '--follow',
+            action='store_true',
+            help='Не завершаться, а ждать новых комментариев.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0.5,
+            help='Пауза в секундах, когда очередь пуста (с --follow).',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            drained = drain(options['batch_size'])
+            total += drained
+            if drained:
+                continue
+            if not options['follow']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'Обработано записей очереди: {total}')
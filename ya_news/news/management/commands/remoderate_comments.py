@@ -0,0 +1,135 @@
+import time
+from collections import Counter, deque
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from news.forms import BAD_WORDS
+from news.matcher import AhoCorasick, get_matcher, load_words
+from news.models import Comment, News
+from news.signals import invalidate_news
+
+FLAG = 'flag'
+DELETE = 'delete'
+
+_worker_matcher = None
+
+
+def _init_worker(words):
+    global _worker_matcher
+    _worker_matcher = AhoCorasick(words)
+
+
+def _find_offenders(rows, matcher=None):
+    """Отбирает (pk, news_id) комментариев с запрещёнными словами."""
+    matcher = matcher or _worker_matcher
+    return [
+        (pk, news_id) for pk, news_id, text in rows
+        if matcher.search(text.lower()) is not None
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново проверяет сохранённые комментарии на запрещённые слова '
+        'и отмечает или удаляет нарушителей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--action', choices=(FLAG, DELETE), default=FLAG,
+            help='Что делать с нарушителями.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько комментариев читать одним запросом.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=0,
+            help='Размер пула процессов; 0 — проверять в этом процессе.',
+        )
+
+    def handle(self, *args, **options):
+        self.action = options['action']
+        self.processed = self.offenders = 0
+        started = time.monotonic()
+        chunks = self.iter_chunks(options['chunk_size'])
+        if options['workers']:
+            self.check_in_pool(chunks, options['workers'])
+        else:
+            matcher = get_matcher(BAD_WORDS)
+            for rows in chunks:
+                self.apply(_find_offenders(rows, matcher))
+        elapsed = time.monotonic() - started
+        rate = self.processed / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено: {self.processed}, нарушителей: {self.offenders}, '
+            f'{elapsed:.1f} с, {rate:.0f} комментариев/с'
+        ))
+
+    def iter_chunks(self, chunk_size):
+        """
+        Читает комментарии порциями по первичному ключу.
+
+        В памяти держится не больше одной порции, и каждая порция — это
+        поиск по индексу, а не OFFSET.
+        """
+        last_pk = 0
+        while True:
+            rows = list(
+                Comment.objects.filter(pk__gt=last_pk).order_by(
+                    'pk'
+                ).values_list('pk', 'news_id', 'text')[:chunk_size]
+            )
+            if not rows:
+                return
+            last_pk = rows[-1][0]
+            self.processed += len(rows)
+            yield rows
+
+    def check_in_pool(self, chunks, workers):
+        """Проверяет порции в пуле, держа в работе не больше 2×workers."""
+        with Pool(
+            workers, initializer=_init_worker,
+            initargs=(load_words(BAD_WORDS),),
+        ) as pool:
+            pending = deque()
+            for rows in chunks:
+                pending.append(pool.apply_async(_find_offenders, (rows,)))
+                if len(pending) >= workers * 2:
+                    self.apply(pending.popleft().get())
+            while pending:
+                self.apply(pending.popleft().get())
+
+    def apply(self, offenders):
+        """Обновляет или удаляет нарушителей одной пачкой."""
+        if not offenders:
+            return
+        pks = [pk for pk, _ in offenders]
+        with transaction.atomic():
+            if self.action == FLAG:
+                self.offenders += Comment.objects.filter(
+                    pk__in=pks, is_flagged=False
+                ).update(is_flagged=True)
+                # UPDATE не вызывает сигналы, поэтому версии новостей и
+                # закешированные фрагменты комментариев обновляем сами.
+                news_ids = {news_id for _, news_id in offenders}
+                News.objects.filter(pk__in=news_ids).update(
+                    version=F('version') + 1
+                )
+                for news_id in news_ids:
+                    invalidate_news(news_id)
+                return
+            Comment.objects.filter(pk__in=pks).delete()
+            self.offenders += len(pks)
+            per_news = Counter(news_id for _, news_id in offenders)
+            by_amount = {}
+            for news_id, amount in per_news.items():
+                by_amount.setdefault(amount, []).append(news_id)
+            for amount, news_ids in by_amount.items():
+                News.objects.filter(pk__in=news_ids).update(
+                    comment_count=F('comment_count') - amount,
+                    version=F('version') + 1,
+                )
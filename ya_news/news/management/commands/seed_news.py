@@ -0,0 +1,196 @@
+import bisect
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from news.models import Comment, News, make_excerpt
+
+# Дата последней новости: от неё отсчитываются остальные, чтобы одинаковый
+# seed давал одинаковые данные в любой день.
+LAST_DATE = date(2024, 1, 1)
+NEWS_PER_DAY = 5
+# За сколько секунд после полуночи дня новости приходят комментарии.
+COMMENTS_SPAN = 3 * 24 * 60 * 60
+WORDS = (
+    'город новости выборы погода спорт футбол хоккей театр выставка '
+    'концерт метро дорога ремонт школа больница парк мост река лес '
+    'зима весна лето осень рынок цены курс банк завод фестиваль '
+    'премьера матч победа рекорд мэр депутат закон налог'
+).split()
+
+
+def zipf_weights(count, skew, rng):
+    """
+    Накопленные веса распределения Ципфа в случайном порядке.
+
+    Несколько «горячих» элементов получают большую часть выборок, а
+    перемешивание разбрасывает их по всему архиву.
+    """
+    weights = [1 / rank ** skew for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+def sentence(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+def news_date(index):
+    """Дата index-й новости: от новых к старым, NEWS_PER_DAY в день."""
+    return LAST_DATE - timedelta(days=index // NEWS_PER_DAY)
+
+
+@contextmanager
+def explicit_created():
+    """
+    Даёт вставить комментарии со своим временем created.
+
+    auto_now_add перезаписывает поле при вставке, в том числе в
+    bulk_create, поэтому на время заполнения его отключаем.
+    """
+    field = Comment._meta.get_field('created')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу новостями, пользователями и комментариями для '
+        'нагрузочных тестов. Один и тот же --seed даёт те же данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель Ципфа для числа комментариев к новости.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+        author_ids = self.create_users(options['users'], options['seed'])
+        counts = self.comment_counts(
+            options['news'], options['comments'], options['skew'], rng
+        )
+        for start in range(0, options['news'], self.batch_size):
+            with transaction.atomic(), explicit_created():
+                news_ids = self.create_news(
+                    counts[start:start + self.batch_size], start, rng
+                )
+                self.create_comments(
+                    news_ids, counts[start:start + self.batch_size], start,
+                    author_ids, rng,
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'Новостей: {options["news"]}, комментариев: '
+            f'{sum(counts)}, пользователей: {len(author_ids)}, '
+            f'{time.monotonic() - started:.1f} с'
+        ))
+
+    def create_users(self, count, seed):
+        """Пользователи seed-<seed>-<N>; повторный запуск их переиспользует."""
+        User = get_user_model()
+        prefix = f'seed-{seed}-'
+        password = make_password(None)
+        for start in range(0, count, self.batch_size):
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    (
+                        User(username=f'{prefix}{index}', password=password)
+                        for index in range(
+                            start, min(start + self.batch_size, count)
+                        )
+                    ),
+                    ignore_conflicts=True,
+                )
+        return list(
+            User.objects.filter(username__startswith=prefix).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:count]
+        )
+
+    def comment_counts(self, news_count, comments, skew, rng):
+        """Сколько комментариев получит каждая новость."""
+        counts = [0] * news_count
+        if not news_count:
+            return counts
+        cum_weights = zipf_weights(news_count, skew, rng)
+        total = cum_weights[-1]
+        for _ in range(comments):
+            index = bisect.bisect(cum_weights, rng.random() * total)
+            counts[min(index, news_count - 1)] += 1
+        return counts
+
+    def create_news(self, counts, offset, rng):
+        """
+        Вставляет пачку новостей сразу с comment_count.
+
+        Новости идут от новых к старым, по несколько за день. id пачки
+        перечитываем: SQLite в Django 3.2 не возвращает их из bulk_create.
+        """
+        last_pk = News.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        title_length = News._meta.get_field('title').max_length
+        batch = []
+        for index, count in enumerate(counts):
+            title = sentence(rng, 2, 5)[:title_length]
+            text = sentence(rng, 30, 120) + '.'
+            batch.append(News(
+                title=title,
+                text=text,
+                # bulk_create не вызывает save(), отрывок считаем сами.
+                excerpt=make_excerpt(text),
+                date=news_date(offset + index),
+                comment_count=count,
+            ))
+        News.objects.bulk_create(batch)
+        return list(
+            News.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def create_comments(self, news_ids, counts, offset, author_ids, rng):
+        """
+        Комментарии пачками по batch_size.
+
+        Время created берётся из rng в первые дни после даты новости и
+        идёт по возрастанию, поэтому одинаковый seed даёт одинаковое
+        время, а порядок комментариев совпадает с порядком вставки.
+        """
+        batch = []
+        for index, (news_id, count) in enumerate(zip(news_ids, counts)):
+            published = datetime.combine(
+                news_date(offset + index), datetime.min.time(),
+                tzinfo=timezone.utc,
+            )
+            for seconds in sorted(
+                rng.randrange(COMMENTS_SPAN) for _ in range(count)
+            ):
+                batch.append(Comment(
+                    news_id=news_id,
+                    author_id=rng.choice(author_ids),
+                    text=sentence(rng, 3, 30),
+                    created=published + timedelta(seconds=seconds),
+                ))
+                if len(batch) >= self.batch_size:
+                    Comment.objects.bulk_create(batch)
+                    batch = []
+        Comment.objects.bulk_create(batch)
@@ -0,0 +1,114 @@
+import os
+from collections import deque
+
+from django.conf import settings
+
+
+class AhoCorasick:
+    """
+    Автомат Ахо — Корасик для поиска сразу всех слов из словаря.
+
+    Текст просматривается один раз, поэтому время поиска зависит от длины
+    текста, а не от произведения длины текста на размер словаря.
+    """
+
+    def __init__(self, words):
+        self._goto = [{}]
+        self._fail = [0]
+        self._match = [None]
+        for word in words:
+            if word:
+                self._add(word)
+        self._link()
+
+    def _add(self, word):
+        state = 0
+        for char in word:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._match.append(None)
+                self._goto[state][char] = following
+            state = following
+        if self._match[state] is None:
+            self._match[state] = word
+
+    def _link(self):
+        """Строит суффиксные ссылки обходом бора в ширину."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[following] = self._goto[fail].get(char, 0)
+                if self._match[following] is None:
+                    self._match[following] = self._match[
+                        self._fail[following]
+                    ]
+
+    def search(self, text):
+        """Возвращает первое найденное слово или None."""
+        goto, fail, match = self._goto, self._fail, self._match
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if match[state] is not None:
+                return match[state]
+        return None
+
+
+def read_words(path):
+    """Читает словарь: одно слово на строку, # — комментарий."""
+    with open(path, encoding='utf-8') as words_file:
+        for line in words_file:
+            word = line.strip().lower()
+            if word and not word.startswith('#'):
+                yield word
+
+
+_matcher = None
+_words = None
+_signature = None
+
+
+def _dictionary_file():
+    """Путь к файлу словаря и его подпись или (None, None)."""
+    path = getattr(settings, 'BAD_WORDS_FILE', None)
+    if not path:
+        return None, None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None, None
+    return path, (path, stat.st_mtime_ns, stat.st_size)
+
+
+def load_words(words):
+    """Слова words вместе со словами из файла словаря."""
+    all_words = [word.lower() for word in words]
+    path, _ = _dictionary_file()
+    if path:
+        all_words.extend(read_words(path))
+    return all_words
+
+
+def get_matcher(words):
+    """
+    Автомат для words и файла settings.BAD_WORDS_FILE.
+
+    Автомат строится один раз на процесс и перестраивается, только когда
+    меняется список слов или файл словаря.
+    """
+    global _matcher, _words, _signature
+    _, file_signature = _dictionary_file()
+    if words is not _words or file_signature != _signature:
+        _matcher = AhoCorasick(load_words(words))
+        _words, _signature = words, file_signature
+    return _matcher
@@ -0,0 +1,91 @@
+from django.db import migrations
+
+FTS_TABLE = 'news_news_fts'
+BATCH_SIZE = 5000
+
+CREATE_SQL = (
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, text,
+        content='news_news', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # Совпадение в заголовке весит больше, чем в тексте.
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) "
+    "VALUES ('rank', 'bm25(10.0, 1.0)')",
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON news_news BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON news_news BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    # Счётчики и прочие служебные поля меняются часто, поэтому индекс
+    # трогаем только при изменении заголовка или текста.
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF title, text ON news_news
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+)
+
+DROP_SQL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in CREATE_SQL:
+            cursor.execute(statement)
+        last_id = 0
+        while True:
+            cursor.execute(
+                'SELECT MAX(id) FROM (SELECT id FROM news_news '
+                'WHERE id > %s ORDER BY id LIMIT %s)',
+                (last_id, BATCH_SIZE),
+            )
+            batch_end = cursor.fetchone()[0]
+            if batch_end is None:
+                break
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, title, text) '
+                'SELECT id, title, text FROM news_news '
+                'WHERE id > %s AND id <= %s',
+                (last_id, batch_end),
+            )
+            last_id = batch_end
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_comment_is_flagged'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
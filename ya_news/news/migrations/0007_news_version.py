@@ -0,0 +1,64 @@
+# Generated by Django 3.2.15 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+FTS_TABLE = 'news_news_fts'
+
+# SQLite добавляет колонку пересозданием таблицы news_news, а вместе
+# с таблицей пропадают и триггеры полнотекстового индекса из 0006.
+TRIGGERS_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON news_news
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON news_news
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, text ON news_news
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+)
+
+
+def restore_fts_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in TRIGGERS_SQL:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_news_fts'),
+    ]
+
+    operations = [
+        # При откате удаление колонки тоже пересоздаёт таблицу.
+        migrations.RunPython(
+            migrations.RunPython.noop, restore_fts_triggers
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Растёт при изменении новости и её комментариев', verbose_name='Версия'),
+        ),
+        migrations.RunPython(
+            restore_fts_triggers, migrations.RunPython.noop
+        ),
+    ]
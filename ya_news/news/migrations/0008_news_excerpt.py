@@ -0,0 +1,94 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:20
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+FTS_TABLE = 'news_news_fts'
+EXCERPT_WORDS = 15
+BATCH_SIZE = 1000
+
+# Как и в 0007: добавление колонки пересоздаёт таблицу news_news
+# и удаляет триггеры полнотекстового индекса.
+TRIGGERS_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON news_news
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON news_news
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, text ON news_news
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+        VALUES ('delete', old.id, old.title, old.text);
+        INSERT INTO {FTS_TABLE}(rowid, title, text)
+        VALUES (new.id, new.title, new.text);
+    END
+    """,
+)
+
+
+def restore_fts_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in TRIGGERS_SQL:
+            cursor.execute(statement)
+
+
+def fill_excerpts(apps, schema_editor):
+    """
+    Заполняет отрывки пачками по BATCH_SIZE новостей.
+
+    Пачки идут по первичному ключу, поэтому в памяти одновременно только
+    одна пачка текстов, а каждая выборка берётся из индекса.
+    """
+    News = apps.get_model('news', 'News')
+    manager = News.objects.using(schema_editor.connection.alias)
+    last_pk = 0
+    while True:
+        batch = list(
+            manager.filter(pk__gt=last_pk).order_by('pk').only('id', 'text')[
+                :BATCH_SIZE
+            ]
+        )
+        if not batch:
+            break
+        for news in batch:
+            news.excerpt = Truncator(news.text).words(
+                EXCERPT_WORDS, truncate=' …'
+            )
+        manager.bulk_update(batch, ('excerpt',))
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0007_news_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, restore_fts_triggers
+        ),
+        migrations.AddField(
+            model_name='news',
+            name='excerpt',
+            field=models.TextField(default='', editable=False, help_text='Начало текста для ленты, обновляется при сохранении', verbose_name='Отрывок'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            restore_fts_triggers, migrations.RunPython.noop
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
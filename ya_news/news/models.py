@@ -1,22 +1,77 @@
 from datetime import datetime
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils.text import Truncator
+
+# Сколько слов текста показывается в ленте.
+EXCERPT_WORDS = 15
+# Колонки, которые выводит карточка новости в ленте и в поиске; по
+# version строится ключ кеша карточки.
+NEWS_ITEM_FIELDS = (
+    'id', 'title', 'date', 'excerpt', 'comment_count', 'version',
+)
+
+
+def make_excerpt(text):
+    """Начало текста для ленты, как у фильтра truncatewords."""
+    return Truncator(text).words(EXCERPT_WORDS, truncate=' …')
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
+    excerpt = models.TextField(
+        'Отрывок',
+        editable=False,
+        help_text='Начало текста для ленты, обновляется при сохранении',
+    )
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=1,
+        editable=False,
+        help_text='Растёт при изменении новости и её комментариев',
+    )
 
     class Meta:
-        ordering = ('-date',)
+        ordering = ('-date', '-id')
+        indexes = (
+            models.Index(fields=('-date', '-id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        """
+        Обновляем отрывок, а при изменении новости — и версию.
+
+        Версия увеличивается на стороне базы, в том числе при сохранении
+        отдельных полей через update_fields.
+        """
+        self.excerpt = make_excerpt(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        # Пустой update_fields Django не сохраняет вовсе.
+        nothing_to_save = update_fields is not None and not update_fields
+        if self._state.adding or nothing_to_save:
+            return super().save(*args, **kwargs)
+        if update_fields is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=('version',))
+
 
 class Comment(models.Model):
     news = models.ForeignKey(
@@ -29,9 +84,44 @@ class Comment(models.Model):
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    is_flagged = models.BooleanField(
+        'Нарушает правила',
+        default=False,
+        help_text='Отмечается командой remoderate_comments',
+    )
 
     class Meta:
-        ordering = ('created',)
+        ordering = ('created', 'id')
+        indexes = (
+            models.Index(
+                fields=('news', 'created', 'id'),
+                name='comment_news_created_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+    def save(self, *args, **kwargs):
+        """
+        Вместе с комментарием увеличиваем версию новости.
+
+        Новый комментарий ещё и увеличивает счётчик комментариев.
+        """
+        changes = {'version': F('version') + 1}
+        if self._state.adding:
+            changes['comment_count'] = F('comment_count') + 1
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            News.objects.filter(pk=self.news_id).update(**changes)
+
+    def delete(self, *args, **kwargs):
+        """Вместе с комментарием уменьшаем счётчик у новости."""
+        news_id = self.news_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            News.objects.filter(pk=news_id).update(
+                comment_count=F('comment_count') - 1,
+                version=F('version') + 1,
+            )
+        return result
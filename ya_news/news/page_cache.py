@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from hashlib import md5
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve, reverse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers,
+)
+from django.utils.module_loading import import_string
+
+from .cache import (
+    WAIT_STEP, SingleFlight, get_pages_version, get_version,
+    require_shared_cache,
+)
+
+PAGE_KEY = 'news:page:{version}:{path}'
+
+page_stats = Counter()
+
+logger = logging.getLogger(__name__)
+
+
+def page_version(match):
+    """
+    Версия, от которой зависит страница.
+
+    Страница одной новости устаревает вместе с её версией, остальные
+    страницы — при любом изменении новостей и комментариев.
+    """
+    if 'pk' in match.kwargs:
+        return f'news{match.kwargs["pk"]}-{get_version(match.kwargs["pk"])}'
+    return f'pages-{get_pages_version()}'
+
+
+def news_paths(pk):
+    """Пути страниц, которые показывают новость pk."""
+    return [
+        reverse('news:home'),
+        reverse('news:search'),
+        reverse('news:detail', args=(pk,)),
+    ]
+
+
+def purge_pages(paths):
+    """
+    Сообщает внешним кешам об устаревших страницах.
+
+    Хуки перечислены в settings.PAGE_CACHE_PURGE_HOOKS. Хук получает
+    список путей; страницы с любой строкой запроса на этих путях тоже
+    устарели. Свой кеш сбрасывается версиями, без хуков.
+    """
+    for hook in settings.PAGE_CACHE_PURGE_HOOKS:
+        import_string(hook)(paths)
+
+
+def log_purge(paths):
+    """Пример хука: записывает сброшенные пути в лог."""
+    logger.info('Сброс страниц: %s', ', '.join(paths))
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Кеширует целые страницы из settings.PAGE_CACHE_ROUTES для анонимов.
+
+    Анонимом считается запрос без cookie сессии: тогда страница не
+    зависит от пользователя, и ключ строится только по пути со строкой
+    запроса и версии данных. Ответы с cookie не кешируются. Для прокси
+    страница публична на PAGE_CACHE_TIMEOUT секунд, для браузера — на
+    PAGE_CACHE_MAX_AGE; запросы с сессией получают private.
+
+    Устаревшую страницу перестраивает один запрос, остальные тем временем
+    получают прежнюю версию страницы или ждут его (см. SingleFlight).
+    Прежнюю версию прокси и браузер не сохраняют. Страницы сбрасываются
+    версиями в кеше, поэтому без PAGE_CACHE_ROUTES middleware отключается,
+    а с ними требует общего для процессов кеша.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PAGE_CACHE_ROUTES:
+            raise MiddlewareNotUsed
+        require_shared_cache('default', 'PAGE_CACHE_ROUTES')
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так же помечает себя MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        flight = self.flight(request)
+        if flight is None:
+            return self.mark_private(request, self.get_response(request))
+        response = flight.get()
+        if response is None and not flight.leader:
+            deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+            while response is None and time.monotonic() < deadline:
+                time.sleep(WAIT_STEP)
+                response = flight.poll()
+        if response is not None:
+            return self.serve(request, flight, response)
+        try:
+            started = time.monotonic()
+            response = self.get_response(request)
+            self.store(request, flight, response, started)
+        finally:
+            flight.release()
+        return response
+
+    async def __acall__(self, request):
+        flight = self.flight(request)
+        if flight is None:
+            return self.mark_private(
+                request, await self.get_response(request)
+            )
+        response = flight.get()
+        if response is None and not flight.leader:
+            deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+            while response is None and time.monotonic() < deadline:
+                await asyncio.sleep(WAIT_STEP)
+                response = flight.poll()
+        if response is not None:
+            return self.serve(request, flight, response)
+        try:
+            started = time.monotonic()
+            response = await self.get_response(request)
+            self.store(request, flight, response, started)
+        finally:
+            flight.release()
+        return response
+
+    def route(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if match.view_name not in settings.PAGE_CACHE_ROUTES:
+            return None
+        return match
+
+    def flight(self, request):
+        """Пересчёт страницы через SingleFlight или None, если не кешируем."""
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return None
+        match = self.route(request)
+        if match is None:
+            return None
+        path = md5(request.get_full_path().encode()).hexdigest()
+        return SingleFlight(
+            PAGE_KEY.format(version=page_version(match), path=path),
+            settings.PAGE_CACHE_TIMEOUT,
+            stale_key=PAGE_KEY.format(version='stale', path=path),
+        )
+
+    def serve(self, request, flight, response):
+        page_stats['hits'] += 1
+        if flight.stale:
+            # Прежняя версия страницы отдаётся только на время пересчёта:
+            # прокси не должен сохранить её после сброса.
+            del response['Cache-Control']
+            patch_cache_control(
+                response, private=True, no_cache=True, max_age=0
+            )
+        # Сохранённая страница отвечает на условный запрос так же, как
+        # представление: 304 по ETag.
+        return get_conditional_response(
+            request, etag=response.get('ETag'), response=response
+        )
+
+    def mark_private(self, request, response):
+        if self.route(request) is not None:
+            patch_vary_headers(response, ('Cookie',))
+            patch_cache_control(response, private=True)
+        return response
+
+    def store(self, request, flight, response, started):
+        page_stats['misses'] += 1
+        patch_vary_headers(response, ('Cookie',))
+        if (
+            request.method != 'GET'
+            or response.status_code != 200
+            or response.streaming
+            or response.cookies
+        ):
+            return
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.PAGE_CACHE_MAX_AGE,
+            s_maxage=settings.PAGE_CACHE_TIMEOUT,
+        )
+        flight.set(response, time.monotonic() - started)
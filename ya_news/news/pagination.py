@@ -0,0 +1,176 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+NEXT = 'n'
+PREVIOUS = 'p'
+UP_TO = 'u'
+
+
+class InvalidCursor(Http404):
+    """Курсор повреждён или не подходит к запросу."""
+
+
+class KeysetPage:
+    """Страница выборки и курсоры на соседние страницы."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Постраничный вывод по ключу, а не по OFFSET.
+
+    Каждая страница — это условие «строго после (или до) ключа» плюс LIMIT,
+    поэтому стоимость любой страницы одинакова при наличии индекса,
+    совпадающего с ordering. Последнее поле ordering должно быть уникальным.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    def page(self, cursor=None):
+        """Возвращает страницу, на которую указывает курсор."""
+        if not cursor:
+            return self._page_after(None, has_previous=False)
+        direction, key = self.decode(cursor)
+        if direction == NEXT:
+            return self._page_after(key, has_previous=True)
+        if direction == UP_TO:
+            return self._page_up_to(key)
+        return self._page_before(key)
+
+    def cursor_for(self, obj):
+        """
+        Курсор страницы, которая заканчивается объектом obj.
+
+        Если объект попадает на первую страницу, курсор не нужен и
+        возвращается None. Проверка читает не больше per_page строк индекса.
+        """
+        key = self._key(obj)
+        earlier = self.queryset.filter(
+            self._seek(key, self._flipped(self.ordering))
+        )
+        if not earlier[self.per_page - 1:self.per_page].exists():
+            return None
+        return self.encode(UP_TO, obj)
+
+    def _page_after(self, key, has_previous):
+        rows = list(self._slice(key, reverse=False))
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return self._make_page(rows, has_next, has_previous)
+
+    def _page_before(self, key):
+        rows = list(self._slice(key, reverse=True))
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return self._make_page(rows, True, has_previous)
+
+    def _page_up_to(self, key):
+        reverse = self._flipped(self.ordering)
+        rows = list(
+            self.queryset.order_by(*reverse).filter(
+                self._seek(key, reverse) | Q(**dict(zip(self.fields, key)))
+            )[:self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        has_next = self.queryset.filter(
+            self._seek(key, self.ordering)
+        ).exists()
+        return self._make_page(rows, has_next, has_previous)
+
+    def _make_page(self, rows, has_next, has_previous):
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode(NEXT, rows[-1])
+        if rows and has_previous:
+            previous_cursor = self.encode(PREVIOUS, rows[0])
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    def _slice(self, key, reverse):
+        ordering = self._flipped(self.ordering) if reverse else self.ordering
+        queryset = self.queryset.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(self._seek(key, ordering))
+        return queryset[:self.per_page + 1]
+
+    def _seek(self, key, ordering):
+        """
+        Условие «строка идёт после ключа» для заданного порядка.
+
+        Для (-date, -id) это date < d OR (date = d AND id < i).
+        """
+        condition = Q()
+        equal = Q()
+        for name, value in zip(ordering, key):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+        return condition
+
+    @staticmethod
+    def _flipped(ordering):
+        return tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in ordering
+        )
+
+    def _key(self, obj):
+        return [getattr(obj, field) for field in self.fields]
+
+    def encode(self, direction, obj):
+        """Упаковывает ключ объекта в непрозрачный курсор."""
+        meta = self.queryset.model._meta
+        values = [
+            meta.get_field(field).value_to_string(obj)
+            for field in self.fields
+        ]
+        payload = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        """Распаковывает курсор обратно в направление и ключ."""
+        meta = self.queryset.model._meta
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded))
+            if direction not in (NEXT, PREVIOUS, UP_TO):
+                raise ValueError(direction)
+            if len(values) != len(self.fields):
+                raise ValueError(values)
+            key = [
+                meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (
+            ValueError, TypeError, binascii.Error, ValidationError
+        ) as error:
+            raise InvalidCursor('Некорректный курсор.') from error
+        return direction, key
@@ -3,9 +3,74 @@ from datetime import datetime, timedelta, date
 from random import randint
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
 from django.utils import timezone
 
 from news.models import News, Comment
+from yanews.query_budget import RAISE
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    """Общий для процессов кеш: файловый, во временном каталоге."""
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path / 'cache'),
+        }
+    }
+
+
+@pytest.fixture
+def cached_auth(settings, shared_cache):
+    """
+    Сессии и пользователь сессии из общего кеша.
+
+    Нужна до входа в систему: force_login запоминает бэкенд, а сессия
+    создаётся движком из настроек.
+    """
+    settings.SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    settings.AUTHENTICATION_BACKENDS = ['news.auth_cache.CachedModelBackend']
+
+
+@pytest.fixture
+def page_cache(settings, shared_cache):
+    """Кеш целых страниц, как в настройках с общим кешем."""
+    settings.PAGE_CACHE_ROUTES = ('news:home', 'news:search', 'news:detail')
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets(settings):
+    """В тестах превышение бюджета запросов к базе и N+1 — ошибка."""
+    settings.QUERY_BUDGET_MODE = RAISE
+    settings.NPLUSONE_MODE = RAISE
+
+
+@pytest.fixture
+def comment_queue(settings, tmp_path):
+    """Режим очереди комментариев с очередью во временном каталоге."""
+    settings.COMMENT_INGESTION = 'queue'
+    settings.COMMENT_QUEUE_PATH = tmp_path / 'queue.sqlite3'
+    return settings.COMMENT_QUEUE_PATH
+
+
+@pytest.fixture
+def replica(db, settings):
+    """Реплика-заглушка: ещё один псевдоним тестовой базы."""
+    connections.settings['replica'] = connections['default'].settings_dict
+    connections['replica'] = connections['default']
+    settings.DATABASE_REPLICAS = ['replica']
+    yield 'replica'
+    del connections['replica']
+    del connections.settings['replica']
 
 
 @pytest.fixture
@@ -1,9 +1,22 @@
+from datetime import timedelta
+from http import HTTPStatus
+
 import pytest
 
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+from django.test import RequestFactory
 from django.urls import reverse
 from django.conf import settings
 
+from news import async_views
+from news.cache import fragment_stats
+from news.page_cache import AnonymousPageCacheMiddleware, page_stats
 from news.forms import CommentForm
+from news.models import Comment, News
 
 
 @pytest.mark.parametrize(
@@ -78,3 +91,282 @@ def test_comments_order(client, multiple_comments, news):
     ]
     sorted_comments = sorted(all_comments)
     assert all_comments == sorted_comments
+
+
+@pytest.mark.django_db
+def test_news_feed_cursor_walks_whole_archive(client, multiple_news):
+    url = reverse('news:home')
+    response = client.get(url)
+    first_page = [news.pk for news in response.context['news_feed']]
+    seen = list(first_page)
+    page = response.context['page']
+    assert not page.has_previous
+    while page.has_next:
+        response = client.get(url, {'cursor': page.next_cursor})
+        page = response.context['page']
+        seen.extend(news.pk for news in page)
+    expected = list(
+        News.objects.order_by('-date', '-id').values_list('pk', flat=True)
+    )
+    assert seen == expected
+    while page.has_previous:
+        response = client.get(url, {'cursor': page.previous_cursor})
+        page = response.context['page']
+    assert [news.pk for news in page] == first_page
+
+
+def test_comments_page_is_bounded(client, settings, multiple_comments, news):
+    settings.COMMENTS_COUNT_ON_PAGE = 3
+    url = reverse('news:detail', args=(news.id,))
+    response = client.get(url)
+    comments = response.context['comments']
+    assert len(comments) == settings.COMMENTS_COUNT_ON_PAGE
+    assert comments.has_next
+    response = client.get(url, {'comments': comments.next_cursor})
+    next_comments = response.context['comments']
+    assert next_comments.has_previous
+    assert {c.pk for c in comments}.isdisjoint(c.pk for c in next_comments)
+
+
+def test_new_comment_redirect_lands_on_its_page(
+        author_client, settings, multiple_comments, news, form_data
+):
+    settings.COMMENTS_COUNT_ON_PAGE = 3
+    Comment.objects.update(created=F('created') - timedelta(days=2))
+    url = reverse('news:detail', args=(news.id,))
+    response = author_client.post(url, data=form_data, follow=True)
+    new_comment = Comment.objects.get(text=form_data['text'])
+    assert new_comment in response.context['comments']
+    assert not response.context['comments'].has_next
+
+
+def test_feed_fragments_are_reused_until_news_changes(
+        client, settings, author, news
+):
+    settings.PAGE_CACHE_ROUTES = ()
+    url = reverse('news:home')
+    fragment_stats.clear()
+    client.get(url)
+    assert fragment_stats == {'misses': 1}
+    response = client.get(url)
+    assert fragment_stats == {'misses': 1, 'hits': 1}
+    Comment.objects.create(news=news, author=author, text='Текст')
+    response = client.get(url)
+    assert fragment_stats['misses'] == 2
+    assert 'Комментариев: 1' in response.content.decode()
+
+
+def test_fragments_follow_row_version_without_signals(
+        client, settings, news
+):
+    # Так выглядит изменение из другого процесса: сигналы этого процесса
+    # о нём не знают, но версия приходит вместе со строкой.
+    settings.PAGE_CACHE_ROUTES = ()
+    url = reverse('news:home')
+    client.get(url)
+    News.objects.filter(pk=news.pk).update(
+        title='Другой заголовок', version=F('version') + 1
+    )
+    assert 'Другой заголовок' in client.get(url).content.decode()
+
+
+def test_saving_some_fields_changes_version(news):
+    version = news.version
+    news.title = 'Новый заголовок'
+    news.save(update_fields=['title'])
+    assert news.version == version + 1
+    news.refresh_from_db()
+    assert (news.title, news.version) == ('Новый заголовок', version + 1)
+
+
+def test_anonymous_pages_are_cached_until_comment(
+        client, django_assert_num_queries, page_cache, author, news
+):
+    url = reverse('news:home')
+    page_stats.clear()
+    client.get(url)
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert page_stats == {'misses': 1, 'hits': 1}
+    assert 'public' in response['Cache-Control']
+    assert 'Cookie' in response['Vary']
+    Comment.objects.create(news=news, author=author, text='Текст')
+    assert 'Комментариев: 1' in client.get(url).content.decode()
+
+
+def test_detail_page_purge_reaches_hooks(
+        client, settings, caplog, django_capture_on_commit_callbacks,
+        author, news
+):
+    settings.PAGE_CACHE_PURGE_HOOKS = ['news.page_cache.log_purge']
+    caplog.set_level('INFO', logger='news.page_cache')
+    url = reverse('news:detail', args=(news.pk,))
+    client.get(url)
+    with django_capture_on_commit_callbacks(execute=True):
+        Comment.objects.create(news=news, author=author, text='Новый')
+    assert url in caplog.text
+    assert 'Новый' in client.get(url).content.decode()
+
+
+def test_stale_page_is_not_stored_by_proxies(client, page_cache, news):
+    url = reverse('news:home')
+    fresh = client.get(url)
+    assert 'public' in fresh['Cache-Control']
+    news.title = 'Новый заголовок'
+    news.save()
+    # Пересчёт уже идёт в другом запросе: этот получает прежнюю версию.
+    flight = AnonymousPageCacheMiddleware(lambda request: None).flight(
+        RequestFactory().get(url)
+    )
+    assert flight.get() is None and flight.leader
+    try:
+        stale = client.get(url)
+    finally:
+        flight.release()
+    assert stale.content == fresh.content
+    assert 'public' not in stale['Cache-Control']
+    assert 'no-cache' in stale['Cache-Control']
+    assert 'private' in stale['Cache-Control']
+
+
+def test_page_cache_refuses_local_cache(settings):
+    settings.PAGE_CACHE_ROUTES = ('news:home',)
+    with pytest.raises(ImproperlyConfigured):
+        AnonymousPageCacheMiddleware(lambda request: None)
+
+
+def test_authenticated_pages_are_private(author_client, page_cache, news):
+    url = reverse('news:home')
+    page_stats.clear()
+    author_client.get(url)
+    response = author_client.get(url)
+    assert not page_stats
+    assert 'private' in response['Cache-Control']
+
+
+def test_comment_controls_stay_outside_fragment(
+        author_client, admin_client, comment
+):
+    url = reverse('news:detail', args=(comment.news_id,))
+    edit_url = reverse('news:edit', args=(comment.pk,))
+    assert edit_url not in admin_client.get(url).content.decode()
+    assert edit_url in author_client.get(url).content.decode()
+
+
+@pytest.mark.django_db
+def test_search_ranks_title_matches_first(client):
+    in_text = News.objects.create(title='Погода', text='Выборы в городе')
+    in_title = News.objects.create(title='Выборы', text='Прошли спокойно')
+    News.objects.create(title='Спорт', text='Футбол')
+    response = client.get(reverse('news:search'), {'q': 'выборы'})
+    assert list(response.context['results']) == [in_title, in_text]
+
+
+def test_search_index_follows_news_changes(client, news):
+    url = reverse('news:search')
+    news.title = 'Переименованная'
+    news.save()
+    assert list(client.get(url, {'q': 'переимен'}).context['results']) == [
+        news
+    ]
+    assert not client.get(url, {'q': 'Заголовок'}).context['results']
+    news.delete()
+    assert not client.get(url, {'q': 'переимен'}).context['results']
+
+
+@pytest.mark.django_db
+def test_feed_shows_stored_excerpt_without_full_text(client):
+    words = [f'слово{index}' for index in range(40)]
+    News.objects.create(title='Длинная', text=' '.join(words))
+    response = client.get(reverse('news:home'))
+    news = response.context['news_feed'][0]
+    assert 'text' in news.get_deferred_fields()
+    content = response.content.decode()
+    assert news.excerpt == ' '.join(words[:15]) + ' …'
+    assert news.excerpt in content
+    assert words[15] not in content
+
+
+def test_excerpt_follows_text(news):
+    news.text = 'Новый текст'
+    news.save(update_fields=('text',))
+    news.refresh_from_db()
+    assert news.excerpt == 'Новый текст'
+
+
+@pytest.mark.parametrize('name', ('news:feed_rss', 'news:feed_atom'))
+def test_feed_lists_latest_news(client, settings, multiple_news, name):
+    settings.NEWS_COUNT_IN_FEED = 3
+    response = client.get(reverse(name))
+    assert response.streaming
+    content = b''.join(response.streaming_content).decode()
+    for news in News.objects.all()[:3]:
+        assert reverse('news:detail', args=(news.pk,)) in content
+
+
+def test_feed_not_modified_skips_items(
+        client, django_assert_max_num_queries, news
+):
+    url = reverse('news:feed_rss')
+    response = client.get(url)
+    with django_assert_max_num_queries(1):
+        not_modified = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+    news.title = 'Переименованная'
+    news.save()
+    changed = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert changed.status_code == HTTPStatus.OK
+    assert changed['ETag'] != response['ETag']
+    assert not changed.has_header('Last-Modified')
+
+
+def test_feed_etag_comes_from_database(client, news):
+    url = reverse('news:feed_rss')
+    etag = client.get(url)['ETag']
+    cache.clear()
+    assert client.get(url)['ETag'] == etag
+    # Правка в обход сигналов, как из другого процесса.
+    News.objects.filter(pk=news.pk).update(version=F('version') + 1)
+    assert client.get(url)['ETag'] != etag
+
+
+def test_detail_not_modified_with_one_query(
+        client, settings, django_assert_num_queries, news
+):
+    settings.PAGE_CACHE_ROUTES = ()
+    url = reverse('news:detail', args=(news.pk,))
+    response = client.get(url)
+    assert 'Cookie' in response['Vary']
+    with django_assert_num_queries(1):
+        not_modified = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+    assert 'Cookie' in not_modified['Vary']
+
+
+def test_detail_etag_follows_comments_and_viewer(
+        client, author_client, admin_client, news, comment
+):
+    url = reverse('news:detail', args=(news.pk,))
+    etag = author_client.get(url)['ETag']
+    assert admin_client.get(url)['ETag'] != etag
+    assert client.get(url)['ETag'] != etag
+    comment.text = 'Изменённый комментарий'
+    comment.save()
+    assert author_client.get(url)['ETag'] != etag
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize(
+    'view, name, args',
+    (
+        (async_views.news_list, 'news:home', ()),
+        (async_views.news_detail, 'news:detail', ('pk',)),
+    ),
+)
+def test_async_views_render_in_pool(rf, news, view, name, args):
+    kwargs = {arg: news.pk for arg in args}
+    request = rf.get(reverse(name, kwargs=kwargs))
+    request.user = AnonymousUser()
+    response = async_to_sync(view)(request, **kwargs)
+    assert response.status_code == HTTPStatus.OK
+    assert news.title in response.content.decode()
@@ -1,9 +1,26 @@
+import sqlite3
+import threading
+import time
+from io import StringIO
+
 from pytest_django.asserts import assertRedirects, assertFormError
 
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS
 from django.urls import reverse
 
-from news.models import Comment
+from news.auth_cache import USER_KEY, CachedModelBackend
+from news.cache import (
+    LOCK_KEY, flight_stats, needs_early_refresh, single_flight,
+)
+from news.comment_queue import drain
+from news.models import Comment, News
 from news.forms import BAD_WORDS, WARNING
+from news.matcher import AhoCorasick
+from yanews.replicas import STICKY_COOKIE
+from yanews.sqlite.base import DatabaseWrapper as ProductionDatabaseWrapper
 
 from http import HTTPStatus
 
@@ -71,6 +88,30 @@ def test_other_user_cant_delete_comment(
     assert Comment.objects.count() == 1
 
 
+def seed_snapshot():
+    call_command(
+        'seed_news', news=12, comments=40, users=5, batch_size=5, seed=7,
+        stdout=StringIO(),
+    )
+    snapshot = (
+        list(News.objects.order_by('pk').values_list(
+            'title', 'text', 'date', 'comment_count'
+        )),
+        list(Comment.objects.order_by('pk').values_list(
+            'news__title', 'author__username', 'text', 'created'
+        )),
+    )
+    News.objects.all().delete()
+    return snapshot
+
+
+@pytest.mark.django_db
+def test_seed_news_repeats_for_same_seed():
+    news, comments = seed_snapshot()
+    assert len(news) == 12 and len(comments) == 40
+    assert seed_snapshot() == (news, comments)
+
+
 @pytest.mark.parametrize(
     'word',
     (
@@ -85,3 +126,308 @@ def test_user_cant_use_bad_words(word, author_client, news):
     assertFormError(response, 'form', 'text', errors=WARNING)
     comments_count = Comment.objects.count()
     assert comments_count == comments_count_before_post
+
+
+def test_comment_count_follows_comments(author_client, form_data, news):
+    url = reverse('news:detail', args=(news.pk,))
+    author_client.post(url, data=form_data)
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    comment = Comment.objects.get()
+    author_client.post(reverse('news:delete', args=(comment.pk,)))
+    news.refresh_from_db()
+    assert news.comment_count == 0
+
+
+def test_recount_comments_fixes_counter(multiple_comments, news):
+    News.objects.filter(pk=news.pk).update(comment_count=0)
+    call_command('recount_comments', batch_size=1, stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == len(multiple_comments)
+
+
+@pytest.mark.parametrize(
+    'text, expected',
+    (
+        ('ushers', 'she'),
+        ('a his hero', 'his'),
+        ('a hi, s h e', None),
+    )
+)
+def test_matcher_finds_overlapping_words(text, expected):
+    matcher = AhoCorasick(('he', 'she', 'his', 'hers'))
+    assert matcher.search(text) == expected
+
+
+def test_bad_words_file_is_reloaded(settings, tmp_path, author_client, news):
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('# словарь модераторов\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = str(words_file)
+    url = reverse('news:detail', args=(news.pk,))
+    author_client.post(url, data={'text': 'Вот бяка'})
+    assert Comment.objects.count() == 1
+    words_file.write_text('бяка\n', encoding='utf-8')
+    response = author_client.post(url, data={'text': 'Вот бяка'})
+    assertFormError(response, 'form', 'text', errors=WARNING)
+    assert Comment.objects.count() == 1
+
+
+@pytest.mark.parametrize('workers', (0, 2))
+def test_remoderate_comments_flags_offenders(author, news, workers):
+    Comment.objects.create(news=news, author=author, text='Хороший текст')
+    bad = Comment.objects.create(
+        news=news, author=author, text=f'Ты {BAD_WORDS[0].upper()}!'
+    )
+    call_command(
+        'remoderate_comments', chunk_size=1, workers=workers,
+        stdout=StringIO()
+    )
+    assert list(
+        Comment.objects.filter(is_flagged=True).values_list('pk', flat=True)
+    ) == [bad.pk]
+
+
+def test_flagged_comment_is_hidden_on_detail_page(client, author, news):
+    url = reverse('news:detail', args=(news.pk,))
+    comment = Comment.objects.create(
+        news=news, author=author, text=f'Ты {BAD_WORDS[2]}'
+    )
+    assert comment.text in client.get(url).content.decode()
+    call_command('remoderate_comments', stdout=StringIO())
+    content = client.get(url).content.decode()
+    assert comment.text not in content
+    assert 'Комментарий скрыт модератором.' in content
+
+
+def test_remoderate_comments_deletes_offenders(author, news):
+    Comment.objects.create(news=news, author=author, text='Хороший текст')
+    Comment.objects.create(news=news, author=author, text=BAD_WORDS[1])
+    call_command('remoderate_comments', action='delete', stdout=StringIO())
+    news.refresh_from_db()
+    assert Comment.objects.count() == 1
+    assert news.comment_count == 1
+
+
+@pytest.fixture
+def production_db(tmp_path):
+    connection = ProductionDatabaseWrapper({
+        'NAME': str(tmp_path / 'db.sqlite3'),
+        'OPTIONS': {
+            'pragmas': {'busy_timeout': 0},
+            'lock_retries': 10,
+            'lock_backoff': 0.02,
+        },
+        'AUTOCOMMIT': True,
+        'ATOMIC_REQUESTS': False,
+        'CONN_MAX_AGE': 600,
+        'TIME_ZONE': None,
+    })
+    yield connection
+    connection.close()
+
+
+@pytest.mark.django_db
+def test_production_sqlite_profile_sets_pragmas(production_db):
+    with production_db.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        assert cursor.fetchone() == ('wal',)
+        cursor.execute('PRAGMA synchronous')
+        assert cursor.fetchone() == (1,)
+
+
+@pytest.mark.django_db
+def test_production_sqlite_profile_waits_for_lock(production_db):
+    with production_db.cursor() as cursor:
+        cursor.execute('CREATE TABLE counter (value INTEGER)')
+    writer = sqlite3.connect(
+        production_db.settings_dict['NAME'], check_same_thread=False
+    )
+    writer.execute('BEGIN IMMEDIATE')
+    threading.Timer(0.1, writer.commit).start()
+    production_db._start_transaction_under_autocommit()
+    with production_db.cursor() as cursor:
+        cursor.execute('INSERT INTO counter VALUES (1)')
+    production_db.commit()
+    writer.close()
+    with production_db.cursor() as cursor:
+        cursor.execute('SELECT COUNT(*) FROM counter')
+        assert cursor.fetchone() == (1,)
+
+
+def test_reads_go_to_replica(client, replica, news):
+    response = client.get(reverse('news:detail', args=(news.pk,)))
+    assert response.context['news']._state.db == replica
+    response = client.get(reverse('news:home'))
+    assert response.context['news_feed'][0]._state.db == replica
+
+
+def test_author_reads_primary_after_writing(
+        author_client, replica, news, form_data
+):
+    url = reverse('news:detail', args=(news.pk,))
+    response = author_client.post(url, data=form_data)
+    assert STICKY_COOKIE in response.cookies
+    response = author_client.get(url)
+    assert response.context['news']._state.db == DEFAULT_DB_ALIAS
+    assert form_data['text'] in response.content.decode()
+
+
+def test_admin_reads_primary(admin_client, replica, news):
+    response = admin_client.get(reverse('admin:news_news_changelist'))
+    assert response.context['cl'].result_list[0]._state.db == (
+        DEFAULT_DB_ALIAS
+    )
+
+
+def test_single_flight_collapses_concurrent_recomputes():
+    flight_stats.clear()
+    calls = []
+
+    def compute():
+        calls.append(True)
+        time.sleep(0.2)
+        return 'значение'
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(single_flight('ключ', compute, 60))
+        )
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['значение'] * 10
+    assert len(calls) == 1
+    assert flight_stats['computed'] == 1
+    assert flight_stats['waited'] == 9
+
+
+def test_single_flight_serves_stale_while_recomputing():
+    single_flight('ключ:1', lambda: 'старое', 60, stale_key='ключ')
+    flight_stats.clear()
+    cache.add(LOCK_KEY.format(key='ключ:2'), True)
+    assert single_flight(
+        'ключ:2', lambda: pytest.fail('пересчёт'), 60, stale_key='ключ'
+    ) == 'старое'
+    assert flight_stats == {'stale': 1}
+
+
+def test_xfetch_refreshes_only_near_expiry():
+    assert needs_early_refresh(('значение', 0.01, time.time() - 1))
+    assert not needs_early_refresh(('значение', 0.01, time.time() + 60))
+
+
+def test_logged_in_requests_skip_session_and_user_queries(
+        cached_auth, author_client, django_assert_num_queries, news
+):
+    url = reverse('news:home')
+    author_client.get(url)
+    with django_assert_num_queries(1):
+        response = author_client.get(url)
+    assert response.context['user'].is_authenticated
+
+
+def test_cached_user_follows_updates(
+        cached_auth, author_client, author, news
+):
+    url = reverse('news:home')
+    author_client.get(url)
+    author.username = 'Новое имя'
+    author.save()
+    response = author_client.get(url)
+    assert response.context['user'].username == 'Новое имя'
+
+
+def test_password_change_ends_cached_session(
+        cached_auth, author_client, settings, author, news
+):
+    # Завершение сессии — редкий путь, бюджет ленты его не учитывает.
+    settings.QUERY_BUDGETS = {}
+    url = reverse('news:home')
+    author_client.get(url)
+    author.set_password('новый-пароль')
+    author.save()
+    assert not author_client.get(url).context['user'].is_authenticated
+
+
+def test_logout_forgets_cached_user(
+        cached_auth, author_client, author, news
+):
+    author_client.get(reverse('news:home'))
+    assert cache.get(USER_KEY.format(pk=author.pk)) is not None
+    author_client.get(reverse('users:logout'))
+    assert cache.get(USER_KEY.format(pk=author.pk)) is None
+
+
+def test_cached_auth_refuses_local_cache():
+    with pytest.raises(ImproperlyConfigured):
+        CachedModelBackend()
+
+
+def test_queued_comment_is_visible_to_its_author_only(
+        author_client, admin_client, comment_queue, news, form_data
+):
+    url = reverse('news:detail', args=(news.pk,))
+    response = author_client.post(url, data=form_data)
+    assertRedirects(response, f'{url}#pending')
+    assert Comment.objects.count() == 0
+    assert form_data['text'] in author_client.get(url).content.decode()
+    assert form_data['text'] not in admin_client.get(url).content.decode()
+
+
+def test_queued_comment_changes_author_etag(
+        author_client, comment_queue, news, form_data
+):
+    url = reverse('news:detail', args=(news.pk,))
+    etag = author_client.get(url)['ETag']
+    author_client.post(url, data=form_data)
+    assert author_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == (
+        HTTPStatus.OK
+    )
+
+
+def test_drain_moves_queue_to_database(
+        author_client, comment_queue, news, form_data
+):
+    url = reverse('news:detail', args=(news.pk,))
+    for _ in range(3):
+        author_client.post(url, data=form_data)
+    assert drain(batch_size=2) == 2
+    assert drain(batch_size=2) == 1
+    assert drain(batch_size=2) == 0
+    news.refresh_from_db()
+    assert news.comment_count == Comment.objects.filter(news=news).count() == 3
+    content = author_client.get(url).content.decode()
+    assert '(публикуется)' not in content
+    assert content.count(form_data['text']) == 3
+
+
+def test_drain_checks_news_and_authors_on_primary(
+        author_client, settings, comment_queue, news, form_data
+):
+    author_client.post(
+        reverse('news:detail', args=(news.pk,)), data=form_data
+    )
+    # Реплики нет вовсе: любое чтение из неё — ошибка, а отстающая
+    # реплика молча отбросила бы комментарий.
+    settings.DATABASE_REPLICAS = ['lagging']
+    assert drain(batch_size=10) == 1
+    assert Comment.objects.using(DEFAULT_DB_ALIAS).filter(
+        news_id=news.pk
+    ).count() == 1
+
+
+def test_drain_command_skips_deleted_news(
+        author_client, comment_queue, news, form_data
+):
+    author_client.post(
+        reverse('news:detail', args=(news.pk,)), data=form_data
+    )
+    news.delete()
+    out = StringIO()
+    call_command('drain_comments', stdout=out)
+    assert 'Обработано записей очереди: 1' in out.getvalue()
+    assert not Comment.objects.exists()
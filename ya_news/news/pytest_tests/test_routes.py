@@ -1,14 +1,23 @@
 from pytest_django.asserts import assertRedirects
-from django.urls import reverse
+from django.urls import get_resolver, reverse
 
 from http import HTTPStatus
 import pytest
 
+from news import views
+from news.models import Comment
+from news.pagination import KeysetPaginator
+from yanews.nplusone import NPlusOneDetected, query_shape
+from yanews.query_budget import LOG, QueryBudgetExceeded
+
 
 @pytest.mark.django_db
 @pytest.mark.parametrize(
     'name',
-    ('news:home', 'users:login', 'users:logout', 'users:signup')
+    (
+        'news:home', 'news:search', 'news:feed_rss', 'news:feed_atom',
+        'users:login', 'users:logout', 'users:signup',
+    )
 )
 def test_pages_availability_for_anonymous_user(client, name):
     url = reverse(name)
@@ -58,3 +67,85 @@ def test_redirects(client, name, args):
     expected_url = f'{login_url}?next={url}'
     response = client.get(url)
     assertRedirects(response, expected_url)
+
+
+@pytest.mark.django_db
+def test_broken_cursor_is_not_found(client):
+    response = client.get(reverse('news:home'), {'cursor': 'не-курсор'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_too_deep_search_page_is_not_found(client):
+    response = client.get(
+        reverse('news:search'),
+        {'q': 'новости', 'page': '99999999999999999999999'},
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_every_route_has_query_budget(settings):
+    resolver = get_resolver()
+    for namespace in ('news', 'users'):
+        _, namespace_resolver = resolver.namespace_dict[namespace]
+        for name in namespace_resolver.reverse_dict:
+            if isinstance(name, str):
+                assert f'{namespace}:{name}' in settings.QUERY_BUDGETS
+
+
+@pytest.mark.django_db
+def test_exceeded_query_budget_raises(client, settings, news):
+    settings.QUERY_BUDGETS = {**settings.QUERY_BUDGETS, 'news:home': 0}
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(reverse('news:home'))
+
+
+@pytest.mark.django_db
+def test_exceeded_query_budget_is_logged(client, settings, caplog, news):
+    settings.QUERY_BUDGET_MODE = LOG
+    settings.QUERY_BUDGETS = {**settings.QUERY_BUDGETS, 'news:home': 0}
+    assert client.get(reverse('news:home')).status_code == HTTPStatus.OK
+    assert 'news:home' in caplog.text
+
+
+def test_query_shape_ignores_values():
+    assert query_shape(
+        "SELECT * FROM t WHERE id = 1 AND name = 'a''b' AND x IN (%s, %s)"
+    ) == query_shape(
+        "SELECT *  FROM t WHERE id = 22 AND name = 'c' AND x IN (%s)"
+    )
+
+
+@pytest.fixture
+def comments_without_authors(monkeypatch, settings):
+    """Комментарии без select_related('author'): автор — N+1 в шаблоне."""
+    def get_comments_paginator(self, news):
+        return KeysetPaginator(
+            news.comment_set.all(),
+            ordering=Comment._meta.ordering,
+            per_page=settings.COMMENTS_COUNT_ON_PAGE,
+        )
+    monkeypatch.setattr(
+        views.CommentsPageMixin,
+        'get_comments_paginator',
+        get_comments_paginator,
+    )
+
+
+def test_n_plus_one_raises_with_template_line(
+        client, settings, news, multiple_comments, comments_without_authors
+):
+    settings.QUERY_BUDGETS = {}
+    with pytest.raises(NPlusOneDetected, match=r'news/detail\.html:\d+'):
+        client.get(reverse('news:detail', args=(news.pk,)))
+
+
+def test_n_plus_one_is_logged(
+        client, settings, caplog, news, multiple_comments,
+        comments_without_authors
+):
+    settings.QUERY_BUDGETS = {}
+    settings.NPLUSONE_MODE = LOG
+    response = client.get(reverse('news:detail', args=(news.pk,)))
+    assert response.status_code == HTTPStatus.OK
+    assert 'N+1' in caplog.text
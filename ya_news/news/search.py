@@ -0,0 +1,46 @@
+import re
+
+from .models import NEWS_ITEM_FIELDS, News
+
+FTS_TABLE = 'news_news_fts'
+
+WORD_RE = re.compile(r'\w+')
+# Глубже поиск не листается: OFFSET всё равно перебирает все пропущенные
+# совпадения, а огромный номер страницы не влезает в INTEGER SQLite.
+MAX_OFFSET = 10_000
+
+
+def build_match(query):
+    """
+    Превращает пользовательский запрос в безопасное выражение MATCH.
+
+    Каждое слово берётся в кавычки, чтобы операторы FTS5 из запроса не
+    ломали синтаксис, а последнее слово ищется по префиксу.
+    """
+    words = WORD_RE.findall(query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_news(query, limit, offset=0):
+    """
+    Новости, подходящие под запрос, по убыванию релевантности.
+
+    Ранжирование bm25 с весами колонок настроено в миграции 0006.
+    Выбираются только колонки, которые выводит карточка новости.
+    """
+    match = build_match(query)
+    if match is None:
+        return []
+    table = News._meta.db_table
+    columns = ', '.join(f'{table}.{field}' for field in NEWS_ITEM_FIELDS)
+    return list(News.objects.raw(
+        f'SELECT {columns} FROM {FTS_TABLE} '
+        f'JOIN {table} ON {table}.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s '
+        f'ORDER BY {FTS_TABLE}.rank LIMIT %s OFFSET %s',
+        (match, limit, offset),
+    ))
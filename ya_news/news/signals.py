@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .auth_cache import forget_user
+from .cache import bump_pages_version, bump_version
+from .models import Comment, News, make_excerpt
+from .page_cache import news_paths, purge_pages
+
+User = get_user_model()
+
+
+def invalidate_news(pk):
+    """
+    Сбрасывает фрагменты новости сразу и ещё раз после коммита.
+
+    Второй сброс выбрасывает фрагменты, которые параллельный запрос
+    успел построить по данным до коммита. Вместе с фрагментами
+    устаревают закешированные страницы, а внешним кешам сообщается
+    о них после коммита.
+    """
+    bump_version(pk)
+    transaction.on_commit(lambda: bump_version(pk))
+    bump_pages_version()
+    transaction.on_commit(bump_pages_version)
+    transaction.on_commit(lambda: purge_pages(news_paths(pk)))
+
+
+@receiver(pre_save, sender=News)
+def fill_loaded_excerpt(sender, instance, raw, **kwargs):
+    """Команда loaddata сохраняет новости в обход save(): считаем отрывок."""
+    if raw:
+        instance.excerpt = make_excerpt(instance.text)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def news_changed(sender, instance, **kwargs):
+    invalidate_news(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    invalidate_news(instance.news_id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def user_left(sender, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
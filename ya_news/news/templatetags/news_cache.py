@@ -0,0 +1,45 @@
+from django import template
+
+from news.cache import fragment_key, get_fragment
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+
+    def __init__(self, nodelist, name, news, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.news = news
+        self.vary_on = vary_on
+
+    def render(self, context):
+        key = fragment_key(
+            self.name.resolve(context),
+            self.news.resolve(context),
+            *(value.resolve(context) for value in self.vary_on)
+        )
+        return get_fragment(key, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    Кеширует часть шаблона до следующего изменения новости.
+
+    Использование: {% fragment 'имя' news [vary_on ...] %}...{% endfragment %}
+    Внутрь нельзя помещать ничего, что зависит от пользователя.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает имя фрагмента и новость.'
+        )
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
@@ -1,12 +1,24 @@
+from django.conf import settings
 from django.urls import path
 
-from news import views
+from news import async_views, feeds, views
 
 app_name = 'news'
 
+# Под ASGI самые частые страницы обслуживаются асинхронно.
+if settings.SERVER_STACK == 'asgi':
+    news_list = async_views.news_list
+    news_detail = async_views.news_detail
+else:
+    news_list = views.NewsList.as_view()
+    news_detail = views.NewsDetailView.as_view()
+
 urlpatterns = [
-    path('', views.NewsList.as_view(), name='home'),
-    path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path('', news_list, name='home'),
+    path('search/', views.NewsSearch.as_view(), name='search'),
+    path('feed/rss/', feeds.NewsFeed.as_view(), name='feed_rss'),
+    path('feed/atom/', feeds.NewsAtomFeed.as_view(), name='feed_atom'),
+    path('news/<int:pk>/', news_detail, name='detail'),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
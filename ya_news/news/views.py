@@ -1,11 +1,20 @@
+from hashlib import md5
+
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
 
+from . import comment_queue
 from .forms import CommentForm
-from .models import Comment, News
+from .models import NEWS_ITEM_FIELDS, Comment, News
+from .pagination import KeysetPaginator
+from .search import MAX_OFFSET, search_news
 
 
 class NewsList(generic.ListView):
@@ -16,35 +25,109 @@ class NewsList(generic.ListView):
 
     def get_queryset(self):
         """
-        Выводим только несколько последних новостей.
+        Выводим одну страницу ленты, начиная с курсора из запроса.
+
+        Размер страницы определяется в настройках проекта, а число
+        комментариев берём из денормализованного счётчика. Полный текст
+        не загружаем: в ленте выводится сохранённый отрывок.
+        """
+        paginator = KeysetPaginator(
+            self.model.objects.only(*NEWS_ITEM_FIELDS),
+            ordering=self.model._meta.ordering,
+            per_page=settings.NEWS_COUNT_ON_HOME_PAGE,
+        )
+        self.page = paginator.page(self.request.GET.get('cursor'))
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page'] = self.page
+        return context
+
+
+class CommentsPageMixin:
+    """Постраничный вывод комментариев к новости."""
+
+    def get_comments_paginator(self, news):
+        return KeysetPaginator(
+            news.comment_set.select_related('author'),
+            ordering=Comment._meta.ordering,
+            per_page=settings.COMMENTS_COUNT_ON_PAGE,
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['comments'] = self.get_comments_paginator(
+            self.object
+        ).page(self.request.GET.get('comments'))
+        return context
+
+    def get_comment_url(self, comment):
+        """Адрес страницы новости, на которой виден комментарий."""
+        url = reverse('news:detail', kwargs={'pk': comment.news_id})
+        cursor = self.get_comments_paginator(comment.news).cursor_for(comment)
+        if cursor:
+            url += f'?comments={cursor}'
+        return url + '#comments'
+
+
+class NewsSearch(generic.ListView):
+    """Полнотекстовый поиск по новостям."""
+    template_name = 'news/search.html'
+    context_object_name = 'results'
+
+    def get_queryset(self):
+        """
+        Одна страница результатов поиска.
 
-        Их количество определяется в настройках проекта.
+        Берём на одну запись больше, чтобы узнать о следующей странице
+        без подсчёта всех совпадений.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        self.query = self.request.GET.get('q', '').strip()
+        try:
+            self.page_number = max(int(self.request.GET.get('page', 1)), 1)
+        except ValueError:
+            raise Http404('Некорректный номер страницы.')
+        per_page = settings.SEARCH_RESULTS_ON_PAGE
+        offset = (self.page_number - 1) * per_page
+        if offset > MAX_OFFSET:
+            raise Http404('Слишком далёкая страница.')
+        results = search_news(
+            self.query, limit=per_page + 1, offset=offset
+        )
+        self.has_next = len(results) > per_page
+        return results[:per_page]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(
+            query=self.query,
+            page_number=self.page_number,
+            has_next=self.has_next,
+        )
+        return context
 
 
-class NewsDetail(generic.DetailView):
+class NewsDetail(CommentsPageMixin, generic.DetailView):
     model = News
     template_name = 'news/detail.html'
 
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        return get_object_or_404(self.model, pk=self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if self.request.user.is_authenticated:
             context['form'] = CommentForm()
+            context['pending_comments'] = pending_comments(
+                self.request, self.object.pk
+            )
         return context
 
 
 class NewsComment(
         LoginRequiredMixin,
+        CommentsPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
@@ -57,17 +140,72 @@ class NewsComment(
         return super().post(request, *args, **kwargs)
 
     def form_valid(self, form):
-        comment = form.save(commit=False)
-        comment.news = self.object
-        comment.author = self.request.user
-        comment.save()
+        """
+        Сохраняем комментарий сразу или ставим его в очередь.
+
+        Из очереди в базу комментарии переносит команда drain_comments.
+        """
+        if comment_queue.is_enabled():
+            comment_queue.enqueue(
+                self.object.pk, self.request.user.pk, form.cleaned_data['text']
+            )
+            self.comment = None
+            return super().form_valid(form)
+        self.comment = form.save(commit=False)
+        self.comment.news = self.object
+        self.comment.author = self.request.user
+        self.comment.save()
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
-
-
+        if self.comment is None:
+            return reverse(
+                'news:detail', kwargs={'pk': self.object.pk}
+            ) + '#pending'
+        return self.get_comment_url(self.comment)
+
+
+def pending_comments(request, news_id):
+    """
+    Свои комментарии из очереди, чтобы автор сразу видел написанное.
+
+    Вне режима очереди список пуст и файл очереди не открывается.
+    """
+    if not comment_queue.is_enabled() or not request.user.is_authenticated:
+        return []
+    return comment_queue.pending_for(news_id, request.user.pk)
+
+
+def viewer_tag(request):
+    """
+    Часть ETag, зависящая от того, кто смотрит страницу.
+
+    Пользователь меняет ссылки редактирования и форму комментария, а
+    CSRF-cookie — токен в форме, поэтому сохранённая копия страницы
+    подходит только тому же пользователю с тем же токеном.
+    """
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    return md5(f'{request.user.pk}:{csrf_cookie}'.encode()).hexdigest()
+
+
+def news_etag(request, pk):
+    """
+    Значение ETag страницы новости: версия строки и зритель.
+
+    Комментарии зрителя в очереди меняют страницу, не трогая версию,
+    поэтому в ETag входит и их число.
+    """
+    version = News.objects.filter(pk=pk).values_list(
+        'version', flat=True
+    ).first()
+    if version is None:
+        return None
+    pending = len(pending_comments(request, pk))
+    return f'{pk}-{version}-{pending}-{viewer_tag(request)}'
+
+
+@method_decorator(vary_on_cookie, name='get')
+@method_decorator(condition(etag_func=news_etag), name='get')
 class NewsDetailView(generic.View):
 
     def get(self, request, *args, **kwargs):
@@ -84,9 +222,9 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        """Комментарий уже загружен в self.object, новость не нужна."""
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .querylog import capture
+
+LOG = 'log'
+RAISE = 'raise'
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Запрос к сайту сделал больше запросов к базе, чем ему положено."""
+
+
+class QueryBudgetMiddleware:
+    """
+    Сверяет число запросов к базе с settings.QUERY_BUDGETS.
+
+    Бюджет задаётся по имени маршрута, например 'news:detail', числом
+    или словарём {метод: число}. При превышении middleware пишет
+    предупреждение или, в режиме QUERY_BUDGET_MODE = 'raise', бросает
+    QueryBudgetExceeded. Запросы, которые потоковый ответ делает уже
+    после возврата из представления, не учитываются.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if settings.QUERY_BUDGET_MODE not in (LOG, RAISE):
+            raise ImproperlyConfigured(
+                f'QUERY_BUDGET_MODE: {settings.QUERY_BUDGET_MODE!r}'
+            )
+        if asyncio.iscoroutinefunction(get_response):
+            # Так же помечает себя MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        with capture() as queries:
+            response = self.get_response(request)
+        self.check(request, queries)
+        return response
+
+    async def __acall__(self, request):
+        with capture() as queries:
+            response = await self.get_response(request)
+        self.check(request, queries)
+        return response
+
+    def check(self, request, queries):
+        match = request.resolver_match
+        if match is None:
+            return
+        budget = settings.QUERY_BUDGETS.get(match.view_name)
+        if isinstance(budget, dict):
+            budget = budget.get(request.method)
+        if budget is None or len(queries) <= budget:
+            return
+        message = (
+            f'{request.method} {request.path} ({match.view_name}): '
+            f'{len(queries)} запросов к базе при бюджете {budget}'
+        )
+        if settings.QUERY_BUDGET_MODE == RAISE:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message, extra={'queries': queries})
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Списки, в которые пишутся запросы: по одному на вложенный capture().
+# Контекстная переменная доходит и до потоков news.async_views.
+_current_logs = ContextVar('query_logs', default=())
+
+
+def _record(execute, sql, params, many, context):
+    for log in _current_logs.get():
+        log.append(sql)
+    return execute(sql, params, many, context)
+
+
+def install(connection):
+    """Подключает запись запросов к соединению; повторный вызов безвреден."""
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    install(connection)
+
+
+connection_created.connect(_on_connection_created)
+
+
+@contextmanager
+def capture(queries=None):
+    """
+    Собирает SQL всех запросов к базам внутри блока.
+
+    В отличие от connection.execute_wrapper, учитываются и запросы из
+    других потоков, если они выполняются в скопированном контексте.
+    Вместо списка можно передать свой объект с методом append(sql).
+    """
+    for connection in connections.all():
+        install(connection)
+    if queries is None:
+        queries = []
+    token = _current_logs.set((*_current_logs.get(), queries))
+    try:
+        yield queries
+    finally:
+        _current_logs.reset(token)
@@ -0,0 +1,96 @@
+import asyncio
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import reverse
+
+# Читать ли в текущем запросе с основной базы, а не с реплики.
+use_primary = ContextVar('use_primary', default=False)
+
+STICKY_COOKIE = 'use_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaRouter:
+    """
+    Чтение — с реплик из settings.DATABASE_REPLICAS, запись — в основную.
+
+    С основной базы читаются запросы, помеченные middleware, а
+    связанные объекты — из той же базы, что и исходный объект.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Связанные объекты читаем оттуда же, откуда сам объект.
+            return instance._state.db
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or use_primary.get():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Отправляет на основную базу запросы, которым нужны свежие данные.
+
+    Это запросы на запись, админка и запросы пользователя в течение
+    settings.REPLICA_LAG секунд после его последней записи: пока реплика
+    не догнала основную базу, он должен видеть свой комментарий.
+    Работает и под WSGI, и под ASGI, не переключая поток.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так же помечает себя MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = use_primary.set(self.needs_primary(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_primary.reset(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        token = use_primary.set(self.needs_primary(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_primary.reset(token)
+        return self.process_response(request, response)
+
+    def needs_primary(self, request):
+        return (
+            request.method not in SAFE_METHODS
+            or STICKY_COOKIE in request.COOKIES
+            or request.path.startswith(reverse('admin:index'))
+        )
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_LAG,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
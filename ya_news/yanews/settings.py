@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -22,6 +23,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'yanews.query_budget.QueryBudgetMiddleware',
+    'yanews.nplusone.NPlusOneMiddleware',
+    'yanews.replicas.PrimaryStickinessMiddleware',
+    'news.page_cache.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -32,6 +37,13 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yanews.urls'
 
+# Стек сервера: wsgi (yanews.wsgi) или asgi (yanews.asgi). Под ASGI
+# лента и страница новости работают через news.async_views.
+SERVER_STACK = os.getenv('SERVER_STACK', 'wsgi')
+
+# Сколько потоков асинхронные представления отдают под базу и шаблоны.
+NEWS_DB_THREADS = int(os.getenv('NEWS_DB_THREADS', 8))
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -54,10 +66,119 @@ WSGI_APPLICATION = 'yanews.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
+    }
+}
+
+# Рабочий профиль: DB_PROFILE=production включает бэкенд yanews.sqlite
+# с WAL и прагмами, постоянные соединения и повторы при занятой базе.
+if os.getenv('DB_PROFILE') == 'production':
+    DATABASES['default'].update(
+        ENGINE='yanews.sqlite',
+        CONN_MAX_AGE=int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        OPTIONS={
+            'lock_retries': int(os.getenv('DB_LOCK_RETRIES', 5)),
+            'lock_backoff': float(os.getenv('DB_LOCK_BACKOFF', 0.05)),
+        },
+    )
+
+# Реплики только для чтения: DB_REPLICAS — пути к копиям базы через
+# запятую. В тестах реплики становятся зеркалами основной базы.
+DATABASE_REPLICAS = []
+for index, name in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['yanews.replicas.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает с основной базы.
+REPLICA_LAG = 5
+
+# Сколько запросов к базе может сделать страница: по имени маршрута,
+# числом или по методам. QUERY_BUDGET_MODE: log — предупреждение в лог,
+# raise — исключение; в тестах включается raise.
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'log')
+QUERY_BUDGETS = {
+    'news:home': 3,
+    'news:search': 3,
+    'news:feed_rss': 1,
+    'news:feed_atom': 1,
+    'news:detail': {'GET': 6, 'HEAD': 6, 'POST': 8},
+    'news:edit': {'GET': 4, 'POST': 7},
+    'news:delete': {'GET': 4, 'POST': 7},
+    'users:login': {'GET': 2, 'POST': 9},
+    'users:logout': 4,
+    'users:signup': 2,
+}
+
+# N+1: одна и та же форма запроса больше NPLUSONE_THRESHOLD раз за
+# запрос. NPLUSONE_MODE: log — предупреждение, raise — исключение.
+NPLUSONE_MODE = os.getenv('NPLUSONE_MODE', 'log')
+NPLUSONE_THRESHOLD = 5
+
+# Ключи фрагментов строятся по News.version, поэтому локальный кеш
+# корректен и в нескольких процессах; общий бэкенд, например
+# django.core.cache.backends.memcached.PyMemcacheCache, лишь позволяет
+# процессам переиспользовать фрагменты друг друга.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# Кеши, которые сбрасываются только сигналами этого процесса, включаются
+# лишь с общим кешем; при запуске они проверяют это сами.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SHARED_CACHE = CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+# С общим кешем сессии и пользователь сессии читаются из кеша, а не из
+# базы. С локальным выход, смена пароля и блокировка пользователя не
+# дошли бы до других процессов, поэтому тогда остаются сессии в базе.
+if SHARED_CACHE:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['news.auth_cache.CachedModelBackend']
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+AUTH_USER_CACHE = 'default'
+AUTH_USER_CACHE_TIMEOUT = 5 * 60
+
+# Целые страницы для анонимов: в нашем кеше и у прокси (s-maxage) они
+# живут PAGE_CACHE_TIMEOUT секунд и сбрасываются при изменениях, браузер
+# хранит их PAGE_CACHE_MAX_AGE секунд. Хуки получают список устаревших
+# путей, например news.page_cache.log_purge. Только с общим кешем.
+PAGE_CACHE_ROUTES = (
+    ('news:home', 'news:search', 'news:detail') if SHARED_CACHE else ()
+)
+PAGE_CACHE_TIMEOUT = 10 * 60
+PAGE_CACHE_MAX_AGE = 30
+PAGE_CACHE_PURGE_HOOKS = []
+
+# Приём комментариев: direct — INSERT прямо в запросе, queue — запись
+# в локальную очередь COMMENT_QUEUE_PATH, из которой комментарии пачками
+# переносит в базу команда drain_comments.
+COMMENT_INGESTION = os.getenv('COMMENT_INGESTION', 'direct')
+COMMENT_QUEUE_PATH = os.getenv(
+    'COMMENT_QUEUE_PATH', BASE_DIR / 'comment_queue.sqlite3'
+)
+
+# Сколько секунд запрос ждёт чужого пересчёта страницы или фрагмента,
+# если старого значения нет, прежде чем считать сам.
+SINGLE_FLIGHT_WAIT = 2.0
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +201,13 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+COMMENTS_COUNT_ON_PAGE = 50
+
+SEARCH_RESULTS_ON_PAGE = 20
+
+NEWS_COUNT_IN_FEED = 20
+
+# Дополнительный словарь запрещённых слов: одно слово на строку.
+# Файл перечитывается при изменении без перезапуска сервера.
+BAD_WORDS_FILE = os.getenv('BAD_WORDS_FILE')
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.conf import settings
+
+# Сессии в кеше: выход из одного процесса должен быть виден остальным.
+CACHED_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+)
 
 
 class NotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notes'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .auth_cache import require_shared_cache
+
+        if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES:
+            require_shared_cache(
+                settings.SESSION_CACHE_ALIAS, 'SESSION_ENGINE'
+            )
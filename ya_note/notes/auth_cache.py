@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+USER_KEY = 'auth:user:{pk}'
+
+
+def require_shared_cache(alias, feature):
+    """
+    Проверяет при запуске, что кеш alias общий для всех процессов.
+
+    Записи в локальном кеше сбрасываются только в своём процессе, и
+    остальные процессы продолжали бы видеть устаревшие данные.
+    """
+    backend = caches[alias]
+    if isinstance(backend, (LocMemCache, DummyCache)):
+        raise ImproperlyConfigured(
+            f'{feature} требует общего для процессов кеша, а кеш '
+            f'{alias!r} — {type(backend).__name__}.'
+        )
+
+
+def user_cache():
+    return caches[settings.AUTH_USER_CACHE]
+
+
+def forget_user(pk):
+    """Выбрасывает пользователя из кеша: следующий запрос прочитает базу."""
+    user_cache().delete(USER_KEY.format(pk=pk))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который берёт пользователя сессии из кеша.
+
+    Кеш задаёт settings.AUTH_USER_CACHE, и он должен быть общим для
+    процессов: сброс при изменении пользователя иначе виден только
+    своему процессу, и выход, смена пароля и блокировка не доходили бы
+    до остальных. Поэтому с локальным кешем бэкенд не создаётся.
+    Вместе с паролем кешируется и хеш для проверки сессии, поэтому смена
+    пароля завершает сессии, как и без кеша.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        require_shared_cache(settings.AUTH_USER_CACHE, 'CachedModelBackend')
+
+    def get_user(self, user_id):
+        key = USER_KEY.format(pk=user_id)
+        user = user_cache().get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                user_cache().set(
+                    key, user, settings.AUTH_USER_CACHE_TIMEOUT
+                )
+        return user
@@ -1,5 +1,3 @@
-from pytils.translit import slugify
-
 from django import forms
 from django.core.exceptions import ValidationError
 
@@ -15,15 +13,33 @@ class NoteForm(forms.ModelForm):
         model = Note
         fields = ('title', 'text', 'slug')
 
-    def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
+    def validate_unique(self):
+        """
+        Уникальность slug не проверяем заранее отдельным запросом.
+
+        Её гарантирует индекс: пустой slug подбирает Note.save, а
+        занятый явный slug превращается в ошибку формы при сохранении.
+        Остальные проверки уникальности модели выполняются как обычно:
+        по полям формы, которые прошли проверку.
+        """
+        exclude = {
+            field.name for field in self.instance._meta.get_fields()
+            if field.name not in self.fields or field.name in self.errors
+        }
+        exclude.add('slug')
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except ValidationError as error:
+            self.add_error(None, error)
+
+    def slug_is_taken(self):
+        """Занят ли явно указанный slug другой заметкой."""
+        slug = self.cleaned_data.get('slug')
         if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
-            raise ValidationError(slug + WARNING)
-        return slug
+            return False
+        return Note.objects.filter(slug=slug).exclude(
+            pk=self.instance.pk
+        ).exists()
+
+    def add_slug_error(self):
+        self.add_error('slug', self.cleaned_data['slug'] + WARNING)
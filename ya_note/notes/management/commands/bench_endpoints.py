@@ -0,0 +1,203 @@
+import json
+import platform
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from notes.models import Note
+
+# Сколько запросов пройти под tracemalloc: он замедляет код в разы,
+# поэтому память меряется отдельным последовательным проходом.
+MEMORY_REQUESTS = 20
+
+
+class Endpoint:
+    """Страница и способ построить i-й запрос к ней."""
+
+    def __init__(self, name, method, make_request):
+        self.name = name
+        self.method = method
+        self.make_request = make_request
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает страницы ya_note параллельными запросами и выводит '
+        'пропускную способность, p50/p99, число запросов к базе и пиковую '
+        'память для каждой страницы. Пишет в базу, поэтому запускать '
+        'на заполненной копии базы (seed_notes).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--endpoints', nargs='+',
+            help='Какие страницы мерить; по умолчанию все.',
+        )
+        parser.add_argument(
+            '--output', help='Куда записать результаты в JSON.',
+        )
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        endpoints = self.get_endpoints(options['requests'])
+        if options['endpoints']:
+            endpoints = [
+                endpoint for endpoint in endpoints
+                if endpoint.name in options['endpoints']
+            ]
+        results = []
+        self.stdout.write(
+            f'{"страница":>10} {"запросов/с":>11} {"p50, мс":>8} '
+            f'{"p99, мс":>8} {"запросов к БД":>14} {"память, КиБ":>12}'
+        )
+        for endpoint in endpoints:
+            result = self.measure(endpoint, options)
+            results.append(result)
+            self.stdout.write(
+                f'{result["endpoint"]:>10} {result["throughput"]:>11.0f} '
+                f'{result["p50_ms"]:>8.1f} {result["p99_ms"]:>8.1f} '
+                f'{result["queries_mean"]:>14.1f} '
+                f'{result["peak_memory_kib"]:>12.0f}'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(
+                    self.report(results, options), output,
+                    ensure_ascii=False, indent=2,
+                )
+
+    def get_endpoints(self, requests):
+        """
+        Страницы для замера от имени автора с наибольшим числом заметок.
+
+        Для редактирования и удаления заранее создаются заметки, по одной
+        на запрос, чтобы каждый запрос делал настоящую работу.
+        """
+        self.user = get_user_model().objects.annotate(
+            notes=Count('note')
+        ).filter(notes__gt=0).order_by('-notes').first()
+        if self.user is None:
+            raise CommandError('В базе нет заметок: запустите seed_notes.')
+        note = Note.objects.filter(author=self.user).first()
+        total = requests + MEMORY_REQUESTS
+        Note.objects.bulk_create(
+            Note(title='Для замера', text='Текст', author=self.user)
+            for _ in range(total * 2)
+        )
+        own_notes = list(
+            Note.objects.filter(author=self.user).order_by(
+                '-pk'
+            ).values_list('slug', flat=True)[:total * 2]
+        )
+        edited, deleted = own_notes[:total], own_notes[total:]
+        return [
+            Endpoint(
+                'list', 'get', lambda index: (reverse('notes:list'), None)
+            ),
+            Endpoint(
+                'detail', 'get',
+                lambda index: (
+                    reverse('notes:detail', args=(note.slug,)), None
+                ),
+            ),
+            Endpoint(
+                'search', 'get',
+                lambda index: (reverse('notes:search'), {'q': 'купить'}),
+            ),
+            Endpoint(
+                'add', 'post',
+                lambda index: (
+                    reverse('notes:add'),
+                    {'title': 'Новая заметка', 'text': f'Текст {index}'},
+                ),
+            ),
+            Endpoint(
+                'edit', 'post',
+                lambda index: (
+                    reverse('notes:edit', args=(edited[index],)),
+                    {
+                        'title': f'Правка {index}',
+                        'text': 'Текст',
+                        'slug': edited[index],
+                    },
+                ),
+            ),
+            Endpoint(
+                'delete', 'post',
+                lambda index: (
+                    reverse('notes:delete', args=(deleted[index],)), None
+                ),
+            ),
+        ]
+
+    def measure(self, endpoint, options):
+        requests = options['requests']
+        local = threading.local()
+
+        def send(index):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client()
+                client.force_login(self.user)
+            path, data = endpoint.make_request(index)
+            queries = []
+            with connection.execute_wrapper(
+                lambda execute, *args: queries.append(1) or execute(*args)
+            ):
+                started = time.perf_counter()
+                response = getattr(client, endpoint.method)(path, data)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                latency = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{endpoint.name}: {path} вернул {response.status_code}'
+                )
+            return latency, len(queries)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            samples = list(executor.map(send, range(requests)))
+        elapsed = time.monotonic() - started
+
+        tracemalloc.start()
+        for index in range(requests, requests + MEMORY_REQUESTS):
+            send(index)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        latencies = [latency for latency, _ in samples]
+        queries = [count for _, count in samples]
+        percentiles = statistics.quantiles(latencies, n=100)
+        return {
+            'endpoint': endpoint.name,
+            'requests': requests,
+            'throughput': requests / elapsed,
+            'p50_ms': percentiles[49] * 1000,
+            'p99_ms': percentiles[98] * 1000,
+            'queries_mean': statistics.mean(queries),
+            'queries_max': max(queries),
+            'peak_memory_kib': peak / 1024,
+        }
+
+    def report(self, results, options):
+        return {
+            'project': 'ya_note',
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'concurrency': options['concurrency'],
+            'results': results,
+        }
@@ -0,0 +1,42 @@
+import sys
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.transfer import import_notes
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заметки пользователя из файла NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл NDJSON; по умолчанию читается stdin.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.NOTES_IMPORT_BATCH_SIZE,
+            help='Сколько заметок вставлять одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден.'
+            )
+        if options['path'] == '-':
+            result = import_notes(author, sys.stdin, options['batch_size'])
+        else:
+            with open(options['path'], encoding='utf-8') as lines:
+                result = import_notes(author, lines, options['batch_size'])
+        for error in result.errors:
+            self.stderr.write(f'Строка {error["line"]}: {error["error"]}')
+        self.stdout.write(
+            self.style.SUCCESS(f'Создано заметок: {result.created}')
+        )
@@ -0,0 +1,111 @@
+import itertools
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.models import Note
+from notes.search import index_notes
+
+WORDS = (
+    'купить молоко хлеб позвонить маме встреча отчёт проект план отпуск '
+    'билеты поезд врач запись книга фильм рецепт борщ пирог список дела '
+    'идея статья код ревью релиз задача срок оплата квартира ремонт'
+).split()
+
+
+def zipf_weights(count, skew, rng):
+    """
+    Накопленные веса распределения Ципфа в случайном порядке.
+
+    Несколько активных авторов пишут большую часть заметок.
+    """
+    weights = [1 / rank ** skew for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+def sentence(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу пользователями и заметками для нагрузочных '
+        'тестов. Один и тот же --seed даёт те же данные.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=100000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель Ципфа для числа заметок у автора.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+        author_ids = self.create_users(options['users'], options['seed'])
+        cum_weights = zipf_weights(len(author_ids), options['skew'], rng)
+        for start in range(0, options['notes'], self.batch_size):
+            size = min(self.batch_size, options['notes'] - start)
+            self.create_notes(
+                rng.choices(author_ids, cum_weights=cum_weights, k=size), rng
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Заметок: {options["notes"]}, пользователей: '
+            f'{len(author_ids)}, {time.monotonic() - started:.1f} с'
+        ))
+
+    def create_users(self, count, seed):
+        """Пользователи seed-<seed>-<N>; повторный запуск их переиспользует."""
+        User = get_user_model()
+        prefix = f'seed-{seed}-'
+        password = make_password(None)
+        for start in range(0, count, self.batch_size):
+            with transaction.atomic():
+                User.objects.bulk_create(
+                    (
+                        User(username=f'{prefix}{index}', password=password)
+                        for index in range(
+                            start, min(start + self.batch_size, count)
+                        )
+                    ),
+                    ignore_conflicts=True,
+                )
+        return list(
+            User.objects.filter(username__startswith=prefix).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:count]
+        )
+
+    def create_notes(self, author_ids, rng):
+        """
+        Вставляет пачку заметок и добавляет её в поисковый индекс.
+
+        Заголовки повторяются, поэтому многие slug получают суффикс -N
+        от NoteManager.bulk_create так же, как при импорте.
+        """
+        with transaction.atomic():
+            last_pk = Note.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            ).first() or 0
+            Note.objects.bulk_create(
+                Note(
+                    title=sentence(rng, 2, 6),
+                    text=sentence(rng, 5, 60) + '.',
+                    author_id=author_id,
+                )
+                for author_id in author_ids
+            )
+            # SQLite в Django 3.2 не возвращает id после bulk_create.
+            index_notes(Note.objects.filter(pk__gt=last_pk).only(
+                'pk', 'author_id', 'title', 'text'
+            ))
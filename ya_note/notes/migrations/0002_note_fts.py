@@ -0,0 +1,73 @@
+import re
+
+from django.db import migrations
+
+FTS_TABLE = 'notes_note_fts'
+BATCH_SIZE = 1000
+
+WORD_RE = re.compile(r'\w+')
+
+
+def to_terms(author_id, text):
+    """Копия notes.search.to_terms на момент создания миграции."""
+    prefix = f'a{author_id}z'
+    return ' '.join(
+        prefix + word for word in WORD_RE.findall(text.lower())
+    )
+
+
+def create_fts(apps, schema_editor):
+    """
+    Индекс ведётся приложением (notes.search), а не триггерами.
+
+    В индекс пишутся слова с префиксом автора, которые в SQL не
+    построить, поэтому и начальное заполнение идёт из Python.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Note = apps.get_model('notes', 'Note')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "title, text, tokenize='unicode61 remove_diacritics 2')"
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) "
+            "VALUES ('rank', 'bm25(10.0, 1.0)')"
+        )
+        last_pk = 0
+        while True:
+            notes = list(
+                Note.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', 'author_id', 'title', 'text'
+                )[:BATCH_SIZE]
+            )
+            if not notes:
+                break
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE}(rowid, title, text) '
+                'VALUES (%s, %s, %s)',
+                [
+                    (pk, to_terms(author_id, title), to_terms(author_id, text))
+                    for pk, author_id, title, text in notes
+                ],
+            )
+            last_pk = notes[-1][0]
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -1,7 +1,25 @@
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 
-from pytils.translit import slugify
+from .slugs import allocate_slugs, base_slug, next_free_slug
+
+# Сколько раз пробовать вставку, если параллельный запрос успел занять
+# выбранный slug между поиском свободного номера и INSERT.
+SLUG_ATTEMPTS = 5
+
+
+class NoteManager(models.Manager):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Перед вставкой пачки раздаём заметкам без slug свободные."""
+        objs = list(objs)
+        allocate_slugs(
+            self.get_queryset(), objs, self.model._meta.get_field(
+                'slug'
+            ).max_length
+        )
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class Note(models.Model):
@@ -27,12 +45,58 @@ class Note(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=1,
+        editable=False,
+        help_text='Растёт при каждом изменении заметки',
+    )
+
+    objects = NoteManager()
+
+    class Meta:
+        indexes = (
+            # Список заметок автора идёт по этому индексу страницами.
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+        )
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+        """
+        При изменении заметки увеличиваем версию на стороне базы.
+
+        Сохранение отдельных полей через update_fields тоже её меняет.
+        """
+        update_fields = kwargs.get('update_fields')
+        # Пустой update_fields Django не сохраняет вовсе.
+        nothing_to_save = update_fields is not None and not update_fields
+        if self._state.adding or nothing_to_save:
+            return self._save_with_slug(*args, **kwargs)
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version'}
+        self.version = F('version') + 1
+        self._save_with_slug(*args, **kwargs)
+        self.refresh_from_db(fields=('version',))
+
+    def _save_with_slug(self, *args, **kwargs):
+        """
+        Без slug сначала пробуем slug из заголовка без проверок.
+
+        Если он занят, берём следующий свободный суффикс -N одним
+        запросом и повторяем вставку.
+        """
+        if self.slug:
+            return super().save(*args, **kwargs)
+        max_length = self._meta.get_field('slug').max_length
+        base = self.slug = base_slug(self.title, max_length)
+        for _ in range(SLUG_ATTEMPTS - 1):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if not type(self).objects.filter(slug=self.slug).exists():
+                    raise
+            self.slug = next_free_slug(type(self).objects, base, max_length)
+        return super().save(*args, **kwargs)
@@ -0,0 +1,114 @@
+import re
+
+from django.db import connection
+
+from .models import Note
+
+FTS_TABLE = 'notes_note_fts'
+
+WORD_RE = re.compile(r'\w+')
+# Глубже поиск не листается: OFFSET всё равно перебирает все пропущенные
+# совпадения, а огромный номер страницы не влезает в INTEGER SQLite.
+MAX_OFFSET = 10_000
+
+
+def author_prefix(author_id):
+    """
+    Префикс, которым помечаются слова автора в индексе.
+
+    Слова разных авторов — разные термы индекса, поэтому поиск читает
+    только списки вхождений самого автора и не касается чужих заметок.
+    Буква после id отделяет его от слова: a4z2x и a42zx не совпадут.
+    """
+    return f'a{author_id}z'
+
+
+def to_terms(author_id, text):
+    prefix = author_prefix(author_id)
+    return ' '.join(
+        prefix + word for word in WORD_RE.findall(text.lower())
+    )
+
+
+def build_match(author_id, query):
+    """Выражение MATCH для запроса автора; последнее слово — префикс."""
+    words = WORD_RE.findall(query.lower())
+    if not words:
+        return None
+    prefix = author_prefix(author_id)
+    terms = [f'"{prefix}{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _rows(notes):
+    return [
+        (
+            note.pk,
+            to_terms(note.author_id, note.title),
+            to_terms(note.author_id, note.text),
+        )
+        for note in notes
+    ]
+
+
+def index_notes(notes):
+    """Добавляет или обновляет заметки в индексе."""
+    rows = _rows(notes)
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+            [(pk,) for pk, _, _ in rows],
+        )
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE}(rowid, title, text) '
+            'VALUES (%s, %s, %s)',
+            rows,
+        )
+
+
+def unindex_note(pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', (pk,))
+
+
+def rebuild_index(batch_size=1000):
+    """Строит индекс заново, читая заметки порциями по первичному ключу."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    indexed = 0
+    last_pk = 0
+    while True:
+        notes = list(
+            Note.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                'pk', 'author_id', 'title', 'text'
+            )[:batch_size]
+        )
+        if not notes:
+            break
+        index_notes(notes)
+        indexed += len(notes)
+        last_pk = notes[-1].pk
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
+    return indexed
+
+
+def search_notes(author, query, limit, offset=0):
+    """Заметки автора, подходящие под запрос, по релевантности."""
+    match = build_match(author.pk, query)
+    if match is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            'ORDER BY rank LIMIT %s OFFSET %s',
+            (match, limit, offset),
+        )
+        pks = [pk for pk, in cursor.fetchall()]
+    notes = Note.objects.filter(author=author).in_bulk(pks)
+    return [notes[pk] for pk in pks if pk in notes]
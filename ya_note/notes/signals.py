@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth_cache import forget_user
+from .models import Note
+from .search import index_notes, unindex_note
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Note)
+def note_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_notes((instance,))
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted(sender, instance, **kwargs):
+    unindex_note(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def user_left(sender, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
@@ -0,0 +1,100 @@
+from django.db.models import Q
+
+from pytils.translit import slugify
+
+# Символ, следующий за '-' в таблице ASCII: интервал [stem-, stem.)
+# охватывает все slug вида stem-…, и его можно взять из индекса slug.
+AFTER_DASH = chr(ord('-') + 1)
+# Сколько основ искать одним запросом: каждая основа добавляет в WHERE
+# ещё одно OR, а глубина выражения в SQLite ограничена. Django к тому же
+# сравнивает каждое новое условие WHERE со всеми прежними, поэтому
+# короткие запросы по индексу выходят дешевле одного длинного.
+MAX_BASES_PER_QUERY = 50
+# Место под суффикс -N: основа с номером всегда укорачивается до одной
+# и той же длины, поэтому номера длинных основ ищутся по одному интервалу.
+SUFFIX_ROOM = 8
+
+
+def base_slug(title, max_length):
+    return slugify(title)[:max_length]
+
+
+def suffix_stem(base, max_length):
+    """Часть основы, к которой дописывается суффикс -N."""
+    return base[:max_length - SUFFIX_ROOM]
+
+
+def with_suffix(base, number, max_length):
+    return f'{suffix_stem(base, max_length)}-{number}'
+
+
+def taken_slugs(queryset, bases, max_length):
+    """
+    Какие основы уже заняты и какие номера заняты у их stem.
+
+    Возвращает (множество занятых основ, {stem: множество N}).
+    Каждая основа — это поиск по интервалу уникального индекса.
+    """
+    bases = list(dict.fromkeys(bases))
+    taken = set()
+    numbers = {suffix_stem(base, max_length): set() for base in bases}
+    for start in range(0, len(bases), MAX_BASES_PER_QUERY):
+        chunk = bases[start:start + MAX_BASES_PER_QUERY]
+        # Условия собираются в один Q сразу, без цепочки |=, которая
+        # копирует дерево условий на каждом шаге.
+        condition = Q(
+            Q(slug__in=chunk),
+            *(
+                Q(slug__gte=f'{stem}-', slug__lt=f'{stem}{AFTER_DASH}')
+                for stem in {suffix_stem(base, max_length) for base in chunk}
+            ),
+            _connector=Q.OR,
+        )
+        for slug in queryset.filter(condition).values_list('slug', flat=True):
+            taken.add(slug)
+            head, _, number = slug.rpartition('-')
+            if head in numbers and number.isdigit():
+                numbers[head].add(int(number))
+    return taken, numbers
+
+
+def next_free_slug(queryset, base, max_length):
+    """Свободный slug для основы, которая уже занята: один запрос."""
+    _, numbers = taken_slugs(queryset, (base,), max_length)
+    stem_numbers = numbers[suffix_stem(base, max_length)]
+    return with_suffix(base, max(stem_numbers, default=0) + 1, max_length)
+
+
+def allocate_slugs(queryset, objs, max_length, keep_explicit=True):
+    """
+    Проставляет уникальные slug объектам перед bulk_create.
+
+    Пересечения ищутся и с базой, и внутри самой пачки. При
+    keep_explicit=False указанный slug считается лишь основой и тоже
+    получает суффикс, если занят.
+    """
+    if keep_explicit:
+        pending = [obj for obj in objs if not obj.slug]
+    else:
+        pending = list(objs)
+    if not pending:
+        return
+    bases = [
+        obj.slug[:max_length] or base_slug(obj.title, max_length)
+        for obj in pending
+    ]
+    used, numbers = taken_slugs(queryset, bases, max_length)
+    if keep_explicit:
+        used.update(obj.slug for obj in objs if obj.slug)
+    for obj, base in zip(pending, bases):
+        slug = base
+        if slug in used:
+            stem_numbers = numbers[suffix_stem(base, max_length)]
+            number = max(stem_numbers, default=0) + 1
+            slug = with_suffix(base, number, max_length)
+            while slug in used:
+                number += 1
+                slug = with_suffix(base, number, max_length)
+            stem_numbers.add(number)
+        used.add(slug)
+        obj.slug = slug
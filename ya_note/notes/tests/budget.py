@@ -0,0 +1,8 @@
+from django.test import TestCase, override_settings
+
+from yanote.query_budget import RAISE
+
+
+@override_settings(QUERY_BUDGET_MODE=RAISE, NPLUSONE_MODE=RAISE)
+class QueryBudgetTestCase(TestCase):
+    """TestCase, в котором лишние и повторяющиеся запросы к базе — ошибка."""
@@ -1,14 +1,17 @@
-from django.test import TestCase, Client
+from http import HTTPStatus
+
+from django.test import Client
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
 from notes.models import Note
 from notes.forms import NoteForm
+from notes.tests.budget import QueryBudgetTestCase
 
 User = get_user_model()
 
 
-class TestAddNotePage(TestCase):
+class TestAddNotePage(QueryBudgetTestCase):
 
     @classmethod
     def setUpTestData(cls):
@@ -54,3 +57,126 @@ class TestAddNotePage(TestCase):
                     isinstance(response.context['form'], NoteForm),
                     True
                 )
+
+
+class TestNoteSearch(QueryBudgetTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.other = User.objects.create(username='Другой')
+        cls.note = Note.objects.create(
+            title='Рецепт борща',
+            text='Свёкла и капуста',
+            author=cls.author,
+            slug='borsch'
+        )
+        cls.other_note = Note.objects.create(
+            title='Борщ у соседа',
+            text='Тоже свёкла',
+            author=cls.other,
+            slug='other-borsch'
+        )
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.url = reverse('notes:search')
+
+    def search(self, query):
+        response = self.author_client.get(self.url, {'q': query})
+        return list(response.context['object_list'])
+
+    def test_search_finds_only_own_notes(self):
+        self.assertEqual(self.search('борщ'), [self.note])
+        self.assertEqual(self.search('свёкл'), [self.note])
+
+    def test_search_ignores_fts_syntax(self):
+        self.assertEqual(self.search('борщ" (*'), [self.note])
+
+    def test_too_deep_page_is_not_found(self):
+        response = self.author_client.get(
+            self.url, {'q': 'борщ', 'page': '99999999999999999999999'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class TestNotesListPages(QueryBudgetTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.other = User.objects.create(username='Другой')
+        Note.objects.bulk_create(
+            Note(title=f'Заметка {index}', text='Текст', author=author)
+            for index in range(7)
+            for author in (cls.author, cls.other)
+        )
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.url = reverse('notes:list')
+
+    def test_cursor_walks_all_own_notes(self):
+        seen = []
+        cursor = ''
+        with self.settings(NOTES_COUNT_ON_LIST_PAGE=3):
+            while True:
+                page = self.author_client.get(
+                    self.url, {'cursor': cursor}
+                ).context['page']
+                self.assertLessEqual(len(page), 3)
+                seen.extend(page)
+                if not page.has_next:
+                    break
+                cursor = page.next_cursor
+        self.assertEqual(
+            [note.pk for note in seen],
+            list(
+                Note.objects.filter(author=self.author).order_by(
+                    'pk'
+                ).values_list('pk', flat=True)
+            ),
+        )
+
+    def test_list_does_not_load_text(self):
+        response = self.author_client.get(self.url)
+        for note in response.context['object_list']:
+            self.assertIn('text', note.get_deferred_fields())
+
+    def test_broken_cursor_is_not_found(self):
+        response = self.author_client.get(self.url, {'cursor': 'не-курсор'})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class TestNoteDetailETag(QueryBudgetTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.note = Note.objects.create(
+            title='Заголовок', text='Текст', author=cls.author, slug='note'
+        )
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.url = reverse('notes:detail', args=(cls.note.slug,))
+
+    def test_not_modified_until_note_changes(self):
+        response = self.author_client.get(self.url)
+        self.assertIn('Cookie', response['Vary'])
+        etag = response['ETag']
+        not_modified = self.author_client.get(
+            self.url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+        self.note.text = 'Новый текст'
+        self.note.save()
+        self.assertEqual(self.note.version, 2)
+        changed = self.author_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, HTTPStatus.OK)
+
+    def test_saving_some_fields_changes_version(self):
+        self.note.title = 'Новый заголовок'
+        self.note.save(update_fields=['title'])
+        self.assertEqual(self.note.version, 2)
+        self.note.refresh_from_db()
+        self.assertEqual(
+            (self.note.title, self.note.version), ('Новый заголовок', 2)
+        )
@@ -1,18 +1,33 @@
 from http import HTTPStatus
 
+import json
+import os
+import tempfile
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from notes.auth_cache import USER_KEY, CachedModelBackend
 from notes.models import Note
 from notes.forms import WARNING
+from notes.search import FTS_TABLE, search_notes
+from notes.tests.budget import QueryBudgetTestCase
 
 from pytils.translit import slugify
 
+from yanote.sqlite.base import DatabaseWrapper as ProductionDatabaseWrapper
+
 User = get_user_model()
 
 
-class TestNoteCreation(TestCase):
+class TestNoteCreation(QueryBudgetTestCase):
     NOTE_CONTENT = 'test note add'
     NOTE_TITLE = 'test_title'
     NOTE_SLUG = 'testslug'
@@ -47,7 +62,7 @@ class TestNoteCreation(TestCase):
         self.assertEqual(note.title, self.NOTE_TITLE)
 
 
-class TestNoteEditDelete(TestCase):
+class TestNoteEditDelete(QueryBudgetTestCase):
     NOTE_CONTENT = 'test note add'
     NOTE_TITLE = 'test_title'
     NOTE_SLUG = 'testslug'
@@ -134,3 +149,275 @@ class TestNoteEditDelete(TestCase):
         )
         expected_slug = slugify(self.form_data_without_slug['title'])
         self.assertEqual(new_note.slug, expected_slug)
+
+
+class TestNoteSearchIndex(QueryBudgetTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.note = Note.objects.create(
+            title='Список покупок',
+            text='Молоко',
+            author=cls.author,
+            slug='shopping'
+        )
+
+    def search(self, query):
+        return search_notes(self.author, query, limit=10)
+
+    def test_index_follows_edit_and_delete(self):
+        self.author_client.post(
+            reverse('notes:edit', args=(self.note.slug,)),
+            data={'title': 'Список дел', 'text': 'Кефир', 'slug': 'shopping'}
+        )
+        self.assertEqual(self.search('кефир'), [self.note])
+        self.assertEqual(self.search('молоко'), [])
+        self.author_client.post(
+            reverse('notes:delete', args=(self.note.slug,))
+        )
+        self.assertEqual(self.search('кефир'), [])
+
+    def test_rebuild_restores_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        self.assertEqual(self.search('молоко'), [])
+        call_command('rebuild_notes_index', stdout=StringIO())
+        self.assertEqual(self.search('молоко'), [self.note])
+
+
+class TestSlugAllocation(QueryBudgetTestCase):
+    TITLE = 'Одинаковый заголовок'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.slug = slugify(cls.TITLE)
+
+    def create(self, **kwargs):
+        return Note.objects.create(
+            title=self.TITLE, text='Текст', author=self.author, **kwargs
+        )
+
+    def test_free_slug_is_inserted_without_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            note = self.create()
+        self.assertEqual(note.slug, self.slug)
+        lookups = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT')
+            and 'notes_note' in query['sql']
+        ]
+        self.assertEqual(lookups, [])
+
+    def test_taken_slug_gets_next_suffix(self):
+        self.create()
+        self.create(slug=f'{self.slug}-7')
+        self.create(slug=f'{self.slug}-tail')
+        self.assertEqual(self.create().slug, f'{self.slug}-8')
+
+    def test_max_length_title_gets_distinct_suffixes(self):
+        title = 'щ' * 40
+        slugs = [
+            Note.objects.create(
+                title=title, text='Текст', author=self.author
+            ).slug
+            for _ in range(4)
+        ]
+        self.assertEqual(len(set(slugs)), len(slugs))
+        bulk = Note.objects.bulk_create(
+            Note(title=title, text='Текст', author=self.author)
+            for _ in range(2)
+        )
+        self.assertEqual(
+            len(set(slugs) | {note.slug for note in bulk}), len(slugs) + 2
+        )
+        max_length = Note._meta.get_field('slug').max_length
+        self.assertTrue(all(len(slug) <= max_length for slug in slugs))
+
+    def test_bulk_create_deduplicates_batch(self):
+        self.create()
+        notes = Note.objects.bulk_create(
+            Note(title=self.TITLE, text='Текст', author=self.author)
+            for _ in range(3)
+        )
+        self.assertEqual(
+            [note.slug for note in notes],
+            [f'{self.slug}-1', f'{self.slug}-2', f'{self.slug}-3'],
+        )
+
+
+class TestNotesTransfer(QueryBudgetTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.author_client = Client()
+        cls.author_client.force_login(cls.author)
+        cls.existing = Note.objects.create(
+            title='Старая', text='Текст', author=cls.author, slug='dup'
+        )
+
+    def test_import_deduplicates_slugs_and_indexes(self):
+        lines = [
+            {'title': 'Первая', 'text': 'Алгебра', 'slug': 'dup'},
+            {'title': 'Вторая', 'text': 'Геометрия', 'slug': 'dup'},
+            {'title': 'Без текста'},
+        ]
+        body = '\n'.join(json.dumps(line) for line in lines) + '\nне json\n'
+        response = self.author_client.post(
+            reverse('notes:import'), data=body,
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(
+            [error['line'] for error in response.json()['errors']], [3, 4]
+        )
+        self.assertEqual(
+            set(Note.objects.values_list('slug', flat=True)),
+            {'dup', 'dup-1', 'dup-2'},
+        )
+        self.assertEqual(
+            [note.title for note in search_notes(self.author, 'алгебр', 5)],
+            ['Первая'],
+        )
+
+    def test_import_reports_non_utf8_line(self):
+        body = (
+            json.dumps({'title': 'Первая', 'text': 'Т'}).encode() + b'\n'
+            + b'{"text": "\xff\xfe"}\n'
+        )
+        response = self.author_client.post(
+            reverse('notes:import'), data=body,
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(
+            [error['line'] for error in response.json()['errors']], [2]
+        )
+
+    def test_export_streams_own_notes(self):
+        other = User.objects.create(username='Другой')
+        Note.objects.create(title='Чужая', text='Т', author=other)
+        response = self.author_client.get(reverse('notes:export'))
+        self.assertTrue(response.streaming)
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            rows, [{'title': 'Старая', 'text': 'Текст', 'slug': 'dup'}]
+        )
+
+    def test_import_command_reads_file(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'notes.ndjson')
+        with open(path, 'w', encoding='utf-8') as ndjson:
+            ndjson.write(json.dumps({'title': 'Файл', 'text': 'Т'}) + '\n')
+        call_command('import_notes', self.author.username, path,
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertTrue(Note.objects.filter(title='Файл').exists())
+
+
+class TestSeedNotes(QueryBudgetTestCase):
+
+    def seed_snapshot(self):
+        call_command(
+            'seed_notes', notes=30, users=5, batch_size=7, seed=7,
+            stdout=StringIO(),
+        )
+        snapshot = list(Note.objects.order_by('pk').values_list(
+            'title', 'text', 'slug', 'author__username'
+        ))
+        Note.objects.all().delete()
+        return snapshot
+
+    def test_same_seed_gives_same_notes(self):
+        notes = self.seed_snapshot()
+        self.assertEqual(len(notes), 30)
+        self.assertEqual(self.seed_snapshot(), notes)
+
+
+class TestProductionSQLiteProfile(QueryBudgetTestCase):
+
+    def test_connection_uses_wal_and_pragmas(self):
+        with tempfile.TemporaryDirectory() as directory:
+            production_db = ProductionDatabaseWrapper({
+                'NAME': os.path.join(directory, 'db.sqlite3'),
+                'OPTIONS': {'pragmas': {'cache_size': -1000}},
+                'AUTOCOMMIT': True,
+                'ATOMIC_REQUESTS': False,
+                'CONN_MAX_AGE': 600,
+                'TIME_ZONE': None,
+            })
+            try:
+                with production_db.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone(), ('wal',))
+                    cursor.execute('PRAGMA cache_size')
+                    self.assertEqual(cursor.fetchone(), (-1000,))
+                    cursor.execute('PRAGMA busy_timeout')
+                    self.assertEqual(cursor.fetchone(), (5000,))
+            finally:
+                production_db.close()
+
+
+class TestCachedAuthentication(QueryBudgetTestCase):
+
+    def setUp(self):
+        # Сессии из кеша включаются только с общим кешем и до входа.
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared_cache = self.settings(
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': directory.name,
+            }},
+            SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+            AUTHENTICATION_BACKENDS=['notes.auth_cache.CachedModelBackend'],
+        )
+        shared_cache.enable()
+        self.addCleanup(shared_cache.disable)
+        self.author = User.objects.create(username='Автор')
+        Note.objects.create(title='Заметка', text='Текст', author=self.author)
+        self.client.force_login(self.author)
+        self.url = reverse('notes:list')
+
+    def test_logged_in_request_skips_session_and_user_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertTrue(response.context['user'].is_authenticated)
+
+    def test_cached_user_follows_updates(self):
+        self.client.get(self.url)
+        self.author.username = 'Новое имя'
+        self.author.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['user'].username, 'Новое имя')
+
+    def test_logout_forgets_cached_user(self):
+        self.client.get(self.url)
+        key = USER_KEY.format(pk=self.author.pk)
+        self.assertIsNotNone(cache.get(key))
+        self.client.get(reverse('users:logout'))
+        self.assertIsNone(cache.get(key))
+
+    def test_password_change_ends_cached_session(self):
+        self.client.get(self.url)
+        self.author.set_password('новый-пароль')
+        self.author.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_refuses_local_cache(self):
+        with self.settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}):
+            with self.assertRaises(ImproperlyConfigured):
+                CachedModelBackend()
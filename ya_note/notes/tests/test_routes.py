@@ -1,15 +1,20 @@
 from http import HTTPStatus
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client
-from django.urls import reverse
+from django.test import Client
+from django.urls import get_resolver, reverse
 
 from notes.models import Note
+from notes.tests.budget import QueryBudgetTestCase
+from yanote.nplusone import RepeatedQueries, query_shape
+from yanote.query_budget import QueryBudgetExceeded
+from yanote.querylog import capture
 
 User = get_user_model()
 
 
-class TestRoutes(TestCase):
+class TestRoutes(QueryBudgetTestCase):
 
     @classmethod
     def setUpTestData(cls):
@@ -88,6 +93,8 @@ class TestRoutes(TestCase):
         urls = (
             ('notes:success', None),
             ('notes:list', None),
+            ('notes:search', None),
+            ('notes:export', None),
             ('notes:add', None),
             ('notes:detail', (self.note.slug,)),
             ('notes:edit', (self.note.slug,)),
@@ -111,3 +118,46 @@ class TestRoutes(TestCase):
                 url = reverse(name, args=args)
                 response = self.author_client.get(url)
                 self.assertRedirects(response, HTTPStatus.OK)
+
+
+class TestQueryBudgets(QueryBudgetTestCase):
+
+    def test_every_route_has_budget(self):
+        resolver = get_resolver()
+        for namespace in ('notes', 'users'):
+            _, namespace_resolver = resolver.namespace_dict[namespace]
+            for name in namespace_resolver.reverse_dict:
+                if not isinstance(name, str):
+                    continue
+                with self.subTest(name=name):
+                    self.assertIn(
+                        f'{namespace}:{name}', settings.QUERY_BUDGETS
+                    )
+
+    def test_exceeded_budget_raises(self):
+        budgets = {**settings.QUERY_BUDGETS, 'users:login': 0}
+        user = get_user_model().objects.create(username='Автор')
+        self.client.force_login(user)
+        with self.settings(QUERY_BUDGETS=budgets):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('users:login'))
+
+
+class TestNPlusOne(QueryBudgetTestCase):
+
+    def test_query_shape_ignores_values(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE id = 1 AND slug = 'a'"),
+            query_shape("SELECT *  FROM t WHERE id = 22 AND slug = 'b'"),
+        )
+
+    def test_repeated_query_reports_origin(self):
+        author = User.objects.create(username='Автор')
+        queries = RepeatedQueries(threshold=2)
+        with capture(queries):
+            for index in range(3):
+                Note.objects.filter(author=author, slug=str(index)).exists()
+        (shape, count, origin), = queries.report()
+        self.assertEqual(count, 3)
+        self.assertIn(__file__, origin)
+        self.assertIn('test_repeated_query_reports_origin', origin)
@@ -0,0 +1,113 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_slug
+from django.db import transaction
+
+from .models import Note
+from .search import index_notes
+from .slugs import allocate_slugs
+
+FIELDS = ('title', 'text', 'slug')
+# Сколько ошибок разбора возвращать пользователю.
+MAX_REPORTED_ERRORS = 100
+
+
+def parse_note(line):
+    """
+    Разбирает одну строку NDJSON в несохранённую заметку.
+
+    Неизвестные поля игнорируются, ошибки формата — ValueError.
+    """
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError('ожидается объект JSON')
+    text = data.get('text')
+    if not isinstance(text, str) or not text:
+        raise ValueError('нет текста заметки')
+    title = data.get('title') or Note._meta.get_field('title').default
+    slug = data.get('slug') or ''
+    if not isinstance(title, str) or not isinstance(slug, str):
+        raise ValueError('title и slug должны быть строками')
+    if slug:
+        try:
+            validate_slug(slug)
+        except ValidationError:
+            raise ValueError(f'некорректный slug {slug!r}')
+    max_title = Note._meta.get_field('title').max_length
+    return Note(title=title[:max_title], text=text, slug=slug)
+
+
+class ImportResult:
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, line_number, error):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': str(error)})
+
+
+def _save_batch(author, notes):
+    """
+    Вставляет пачку одним bulk_create и добавляет её в поисковый индекс.
+
+    Занятые slug получают суффикс -N: занятость проверяется одним
+    запросом по индексу slug на всю пачку.
+    """
+    max_length = Note._meta.get_field('slug').max_length
+    for note in notes:
+        note.author = author
+    with transaction.atomic():
+        allocate_slugs(
+            Note.objects.all(), notes, max_length, keep_explicit=False
+        )
+        Note.objects.bulk_create(notes)
+        # SQLite в Django 3.2 не возвращает id после bulk_create,
+        # поэтому для индекса перечитываем пачку по уникальным slug.
+        index_notes(Note.objects.filter(
+            slug__in=[note.slug for note in notes]
+        ).only('pk', 'author_id', 'title', 'text'))
+
+
+def import_notes(author, lines, batch_size):
+    """Импортирует поток строк NDJSON, держа в памяти одну пачку."""
+    result = ImportResult()
+    batch = []
+    for line_number, line in enumerate(lines, start=1):
+        try:
+            if isinstance(line, bytes):
+                # UnicodeDecodeError — тоже ValueError.
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+            batch.append(parse_note(line))
+        except ValueError as error:
+            result.add_error(line_number, error)
+            continue
+        if len(batch) >= batch_size:
+            _save_batch(author, batch)
+            result.created += len(batch)
+            batch = []
+    if batch:
+        _save_batch(author, batch)
+        result.created += len(batch)
+    return result
+
+
+def export_notes(author, chunk_size=1000):
+    """Построчно отдаёт заметки автора в NDJSON, читая их порциями."""
+    last_pk = 0
+    while True:
+        rows = list(
+            Note.objects.filter(author=author, pk__gt=last_pk).order_by(
+                'pk'
+            ).values('pk', *FIELDS)[:chunk_size]
+        )
+        if not rows:
+            return
+        last_pk = rows[-1]['pk']
+        for row in rows:
+            del row['pk']
+            yield json.dumps(row, ensure_ascii=False) + '\n'
@@ -1,9 +1,20 @@
+from hashlib import md5
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError, transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
 
 from .forms import NoteForm
 from .models import Note
+from .pagination import KeysetPaginator
+from .search import MAX_OFFSET, search_notes
+from .transfer import export_notes, import_notes
 
 
 class Home(generic.TemplateView):
@@ -26,22 +37,38 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+class NoteFormBase(NoteBase):
+    """Базовый класс для создания и редактирования заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        """
+        Занятый slug узнаём от индекса при сохранении.
+
+        Ошибкой формы становится только конфликт явно указанного slug,
+        остальные нарушения целостности пробрасываются дальше.
+        """
+        try:
+            with transaction.atomic():
+                return super().form_valid(form)
+        except IntegrityError:
+            if not form.slug_is_taken():
+                raise
+            form.add_slug_error()
+            return self.form_invalid(form)
+
+
+class NoteCreate(NoteFormBase, generic.CreateView):
+    """Добавление заметки."""
+
+    def form_valid(self, form):
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteFormBase, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -53,7 +80,105 @@ class NotesList(NoteBase, generic.ListView):
     """Список всех заметок пользователя."""
     template_name = 'notes/list.html'
 
-
+    def get_queryset(self):
+        """
+        Одна страница списка, начиная с курсора из запроса.
+
+        Страницы идут по индексу (author_id, id), а из заметок берём
+        только выводимые колонки, поэтому страница стоит одинаково при
+        любом числе заметок у автора.
+        """
+        paginator = KeysetPaginator(
+            super().get_queryset().only('id', 'slug', 'title'),
+            ordering=('id',),
+            per_page=settings.NOTES_COUNT_ON_LIST_PAGE,
+        )
+        self.page = paginator.page(self.request.GET.get('cursor'))
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page'] = self.page
+        return context
+
+
+def note_etag(request, slug):
+    """
+    Значение ETag заметки: версия строки, пользователь и CSRF-cookie.
+
+    Заметку видит только автор, поэтому версия ищется по slug вместе
+    с автором, а чужая заметка остаётся без ETag и получает 404.
+    """
+    version = Note.objects.filter(
+        slug=slug, author=request.user
+    ).values_list('version', flat=True).first()
+    if version is None:
+        return None
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    viewer = md5(f'{request.user.pk}:{csrf_cookie}'.encode()).hexdigest()
+    return f'{slug}-{version}-{viewer}'
+
+
+@method_decorator(vary_on_cookie, name='get')
+@method_decorator(condition(etag_func=note_etag), name='get')
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+
+
+class NoteSearch(NoteBase, generic.ListView):
+    """Поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_queryset(self):
+        """Одна страница результатов; лишняя запись — признак следующей."""
+        self.query = self.request.GET.get('q', '').strip()
+        try:
+            self.page_number = max(int(self.request.GET.get('page', 1)), 1)
+        except ValueError:
+            raise Http404('Некорректный номер страницы.')
+        per_page = settings.NOTES_SEARCH_RESULTS_ON_PAGE
+        offset = (self.page_number - 1) * per_page
+        if offset > MAX_OFFSET:
+            raise Http404('Слишком далёкая страница.')
+        results = search_notes(
+            self.request.user, self.query, limit=per_page + 1, offset=offset
+        )
+        self.has_next = len(results) > per_page
+        return results[:per_page]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(
+            query=self.query,
+            page_number=self.page_number,
+            has_next=self.has_next,
+        )
+        return context
+
+
+class NoteImport(LoginRequiredMixin, generic.View):
+    """Импорт заметок из тела запроса в формате NDJSON."""
+
+    def post(self, request, *args, **kwargs):
+        """Тело читается построчно, а не целиком через request.body."""
+        result = import_notes(
+            request.user, request, settings.NOTES_IMPORT_BATCH_SIZE
+        )
+        return JsonResponse(
+            {'created': result.created, 'errors': result.errors}
+        )
+
+
+class NoteExport(LoginRequiredMixin, generic.View):
+    """Выгрузка всех заметок пользователя в NDJSON потоком."""
+
+    def get(self, request, *args, **kwargs):
+        response = StreamingHttpResponse(
+            export_notes(request.user),
+            content_type='application/x-ndjson; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="notes.ndjson"'
+        )
+        return response
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+import re
+import sys
+import sysconfig
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.template.base import Node
+
+from .querylog import capture
+
+LOG = 'log'
+RAISE = 'raise'
+
+# Управление транзакциями повторяется при любой пачке записей, это не N+1.
+TRANSACTION_RE = re.compile(
+    r'^\s*(SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT)\b', re.IGNORECASE
+)
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+# IN (%s, %s, ...) разной длины — один и тот же запрос.
+IN_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+SPACE_RE = re.compile(r'\s+')
+
+# Кадры из этих каталогов не считаются местом запроса: это Django,
+# стандартная библиотека, сторонние пакеты и сам учёт запросов.
+LIBRARY_DIRS = (
+    os.path.dirname(sys.modules['django'].__file__),
+    sysconfig.get_paths()['stdlib'],
+    sysconfig.get_paths()['purelib'],
+    os.path.dirname(__file__),
+)
+
+logger = logging.getLogger(__name__)
+
+
+class NPlusOneDetected(Exception):
+    """Один и тот же запрос повторился в запросе к сайту слишком часто."""
+
+
+def query_shape(sql):
+    """Форма запроса: SQL без значений, по ней сравниваются повторы."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('(...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def query_origin():
+    """
+    Где выполняется запрос: узел шаблона или первый кадр кода проекта.
+
+    Узел шаблона точнее кадра: {{ comment.author }} в цикле укажет на
+    строку шаблона, а не на внутренности Django.
+    """
+    frame = sys._getframe(1)
+    python_origin = None
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        if isinstance(node, Node) and node.token is not None:
+            return f'{node.origin.name}:{node.token.lineno}'
+        filename = frame.f_code.co_filename
+        if python_origin is None and not (
+            filename.startswith(LIBRARY_DIRS) or filename.startswith('<')
+        ):
+            python_origin = (
+                f'{filename}:{frame.f_lineno} in {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    return python_origin or 'неизвестно'
+
+
+class RepeatedQueries:
+    """
+    Считает формы запросов и запоминает, где форма стала повторяться.
+
+    Передаётся в querylog.capture() вместо списка. Стек разбирается
+    только один раз на форму, когда она превышает порог.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.origins = {}
+
+    def append(self, sql):
+        if TRANSACTION_RE.match(sql):
+            return
+        shape = query_shape(sql)
+        self.counts[shape] += 1
+        if self.counts[shape] == self.threshold + 1:
+            self.origins[shape] = query_origin()
+
+    def report(self):
+        """[(форма, число повторов, откуда)] для форм сверх порога."""
+        return [
+            (shape, self.counts[shape], origin)
+            for shape, origin in self.origins.items()
+        ]
+
+
+class NPlusOneMiddleware:
+    """
+    Ищет N+1: одну форму запроса больше NPLUSONE_THRESHOLD раз за запрос.
+
+    В режиме NPLUSONE_MODE = 'log' пишет предупреждение с формой запроса
+    и местом в шаблоне или коде, в режиме 'raise' бросает
+    NPlusOneDetected.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if settings.NPLUSONE_MODE not in (LOG, RAISE):
+            raise ImproperlyConfigured(
+                f'NPLUSONE_MODE: {settings.NPLUSONE_MODE!r}'
+            )
+        if asyncio.iscoroutinefunction(get_response):
+            # Так же помечает себя MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        queries = RepeatedQueries(settings.NPLUSONE_THRESHOLD)
+        with capture(queries):
+            response = self.get_response(request)
+        self.check(request, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = RepeatedQueries(settings.NPLUSONE_THRESHOLD)
+        with capture(queries):
+            response = await self.get_response(request)
+        self.check(request, queries)
+        return response
+
+    def check(self, request, queries):
+        repeats = queries.report()
+        if not repeats:
+            return
+        message = '\n'.join(
+            [f'N+1 в {request.method} {request.path}:'] + [
+                f'  {count} раз из {origin}: {shape}'
+                for shape, count, origin in repeats
+            ]
+        )
+        if settings.NPLUSONE_MODE == RAISE:
+            raise NPlusOneDetected(message)
+        logger.warning(message)
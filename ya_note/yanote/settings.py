@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -23,6 +24,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'yanote.query_budget.QueryBudgetMiddleware',
+    'yanote.nplusone.NPlusOneMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,10 +58,79 @@ WSGI_APPLICATION = 'yanote.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.getenv('DB_NAME', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Рабочий профиль: DB_PROFILE=production включает бэкенд yanote.sqlite
+# с WAL и прагмами, постоянные соединения и повторы при занятой базе.
+if os.getenv('DB_PROFILE') == 'production':
+    DATABASES['default'].update(
+        ENGINE='yanote.sqlite',
+        CONN_MAX_AGE=int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        OPTIONS={
+            'lock_retries': int(os.getenv('DB_LOCK_RETRIES', 5)),
+            'lock_backoff': float(os.getenv('DB_LOCK_BACKOFF', 0.05)),
+        },
+    )
+
+# Сколько запросов к базе может сделать страница: по имени маршрута,
+# числом или по методам. QUERY_BUDGET_MODE: log — предупреждение в лог,
+# raise — исключение; в тестах включается raise.
+QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'log')
+QUERY_BUDGETS = {
+    'notes:home': 2,
+    'notes:add': {'GET': 2, 'POST': 15},
+    'notes:edit': {'GET': 3, 'POST': 9},
+    'notes:detail': {'GET': 4, 'HEAD': 4},
+    'notes:delete': {'GET': 3, 'POST': 5},
+    'notes:list': 3,
+    'notes:search': 4,
+    # Импорт делает одинаковое число запросов на каждую пачку.
+    'notes:import': 9,
+    'notes:export': 4,
+    'notes:success': 2,
+    'users:login': {'GET': 2, 'POST': 9},
+    'users:logout': 4,
+    'users:signup': 2,
+}
+
+# N+1: одна и та же форма запроса больше NPLUSONE_THRESHOLD раз за
+# запрос. NPLUSONE_MODE: log — предупреждение, raise — исключение.
+NPLUSONE_MODE = os.getenv('NPLUSONE_MODE', 'log')
+NPLUSONE_THRESHOLD = 5
+
+# Для нескольких процессов укажите общий бэкенд, например
+# django.core.cache.backends.memcached.PyMemcacheCache.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Кеши, которые сбрасываются только сигналами этого процесса, включаются
+# лишь с общим кешем; при запуске они проверяют это сами.
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SHARED_CACHE = CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+# С общим кешем сессии и пользователь сессии читаются из кеша, а не из
+# базы. С локальным выход, смена пароля и блокировка пользователя не
+# дошли бы до других процессов, поэтому тогда остаются сессии в базе.
+if SHARED_CACHE:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['notes.auth_cache.CachedModelBackend']
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+AUTH_USER_CACHE = 'default'
+AUTH_USER_CACHE_TIMEOUT = 5 * 60
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +159,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+NOTES_SEARCH_RESULTS_ON_PAGE = 20
+
+NOTES_COUNT_ON_LIST_PAGE = 50
+
+NOTES_IMPORT_BATCH_SIZE = 1000
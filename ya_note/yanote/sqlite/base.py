@@ -0,0 +1,87 @@
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+# Прагмы по умолчанию для рабочего профиля; их можно переопределить
+# в OPTIONS['pragmas'].
+DEFAULT_PRAGMAS = {
+    # Читатели не ждут писателя, а писатель — читателей.
+    'journal_mode': 'WAL',
+    # В режиме WAL NORMAL не портит базу при сбое, но не делает fsync
+    # на каждый коммит.
+    'synchronous': 'NORMAL',
+    # Отрицательное значение — размер в КиБ: 64 МиБ кеша страниц.
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+}
+LOCKED_MESSAGE = 'database is locked'
+
+
+class SQLiteCursorWrapper(base.SQLiteCursorWrapper):
+    """
+    Повторяет запрос, если база занята другим писателем.
+
+    Повтор безопасен только вне открытой транзакции: внутри неё
+    запрос повторяет вся транзакция, а не отдельная команда.
+    """
+    lock_retries = 0
+    lock_backoff = 0
+
+    def execute(self, query, params=None):
+        return self._retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._retry(super().executemany, query, list(param_list))
+
+    def _retry(self, execute, *args):
+        for attempt in range(self.lock_retries + 1):
+            try:
+                return execute(*args)
+            except base.Database.OperationalError as error:
+                if (
+                    attempt == self.lock_retries
+                    or LOCKED_MESSAGE not in str(error)
+                    or self.connection.in_transaction
+                ):
+                    raise
+            time.sleep(
+                self.lock_backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            )
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite с прагмами рабочего профиля и ожиданием занятой базы.
+
+    Дополнительные ключи OPTIONS:
+    pragmas — прагмы поверх DEFAULT_PRAGMAS;
+    transaction_mode — как начинать транзакции, по умолчанию IMMEDIATE,
+    чтобы блокировка на запись бралась сразу и её можно было ждать;
+    lock_retries и lock_backoff — число повторов и начальная пауза
+    в секундах, если база занята дольше busy_timeout.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **params.pop('pragmas', {})}
+        self.transaction_mode = params.pop('transaction_mode', 'IMMEDIATE')
+        self.lock_retries = params.pop('lock_retries', 5)
+        self.lock_backoff = params.pop('lock_backoff', 0.05)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SQLiteCursorWrapper)
+        cursor.lock_retries = self.lock_retries
+        cursor.lock_backoff = self.lock_backoff
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')